@@ -0,0 +1,43 @@
+from alembic import op
+
+revision = '0003_hot_path_indexes'
+down_revision = '0002_add_ip_to_audit'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_applications_created_at_id', 'applications', ['created_at', 'id']),
+    ('ix_applications_created_by_created_at', 'applications', ['created_by', 'created_at']),
+    ('ix_applications_status_created_at', 'applications', ['status', 'created_at']),
+    ('ix_applications_status_reviewed_at', 'applications', ['status', 'reviewed_at']),
+    ('ix_applications_customer_id', 'applications', ['customer_id']),
+    ('ix_audit_logs_created_at', 'audit_logs', ['created_at']),
+    ('ix_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+]
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if _is_postgres():
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with op.get_context().autocommit_block():
+            for name, table, cols in INDEXES:
+                op.create_index(name, table, cols, postgresql_concurrently=True)
+    else:
+        for name, table, cols in INDEXES:
+            op.create_index(name, table, cols)
+
+
+def downgrade():
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,41 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_customer_name_grams'
+down_revision = '0003_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _grams(name):
+    # Frozen copy of app.search.name_grams at the time of this revision
+    s = (name or '').lower()
+    grams = {ch for ch in s if not ch.isspace()}
+    grams.update(s[i:i + 2] for i in range(len(s) - 1) if not s[i:i + 2].isspace())
+    return grams
+
+
+def upgrade():
+    grams = op.create_table(
+        'customer_name_grams',
+        sa.Column('gram', sa.String(length=2), primary_key=True),
+        sa.Column('customer_id', sa.Integer(), sa.ForeignKey('customers.id', ondelete='CASCADE'), primary_key=True),
+    )
+    op.create_index('ix_customer_name_grams_customer_id', 'customer_name_grams', ['customer_id'])
+
+    # Backfill from existing customers
+    bind = op.get_bind()
+    rows = bind.execute(sa.text('SELECT id, name FROM customers')).fetchall()
+    batch = []
+    for cid, name in rows:
+        batch.extend({'gram': g, 'customer_id': cid} for g in _grams(name))
+        if len(batch) >= 5000:
+            op.bulk_insert(grams, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(grams, batch)
+
+
+def downgrade():
+    op.drop_index('ix_customer_name_grams_customer_id', table_name='customer_name_grams')
+    op.drop_table('customer_name_grams')
@@ -0,0 +1,17 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_attachment_size_checksum'
+down_revision = '0004_customer_name_grams'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('application_attachments', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('application_attachments', sa.Column('checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('application_attachments', 'checksum')
+    op.drop_column('application_attachments', 'size')
@@ -0,0 +1,36 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_review_queue_lease'
+down_revision = '0005_attachment_size_checksum'
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status = 'PENDING'")
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    # batch mode: SQLite cannot add a foreign key with plain ALTER TABLE
+    with op.batch_alter_table('applications') as batch:
+        batch.add_column(sa.Column('claimed_by', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('claim_expires_at', sa.DateTime(), nullable=True))
+        batch.create_foreign_key('fk_applications_claimed_by_users', 'users', ['claimed_by'], ['id'], ondelete='SET NULL')
+    if _is_postgres():
+        with op.get_context().autocommit_block():
+            op.create_index('ix_applications_pending_queue', 'applications', ['created_at', 'id'],
+                            postgresql_where=PENDING, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_applications_pending_queue', 'applications', ['created_at', 'id'], sqlite_where=PENDING)
+
+
+def downgrade():
+    op.drop_index('ix_applications_pending_queue', table_name='applications')
+    with op.batch_alter_table('applications') as batch:
+        batch.drop_constraint('fk_applications_claimed_by_users', type_='foreignkey')
+        batch.drop_column('claim_expires_at')
+        batch.drop_column('claimed_by')
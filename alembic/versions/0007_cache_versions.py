@@ -0,0 +1,20 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_cache_versions'
+down_revision = '0006_review_queue_lease'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    versions = op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.bulk_insert(versions, [{'name': 'principals', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
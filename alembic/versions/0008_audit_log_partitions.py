@@ -0,0 +1,94 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_audit_log_partitions'
+down_revision = '0007_cache_versions'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = 'id, user_id, action, target_type, target_id, details, ip, created_at'
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    # SQLite has no declarative partitioning; app.audit_partitions.rotate moves
+    # closed months into audit_logs_YYYYMM shard tables instead
+    if not _is_postgres():
+        return
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_legacy')
+    op.execute('ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey')
+    op.execute('ALTER INDEX ix_audit_logs_created_at RENAME TO ix_audit_logs_legacy_created_at')
+    op.execute('ALTER INDEX ix_audit_logs_user_id_created_at RENAME TO ix_audit_logs_legacy_user_id_created_at')
+    # keep the id sequence alive when the legacy table is dropped
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE')
+    # the partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id integer NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            user_id integer REFERENCES users (id) ON DELETE SET NULL,
+            action varchar(50) NOT NULL,
+            target_type varchar(50) NOT NULL,
+            target_id varchar(255),
+            details text,
+            ip varchar(64),
+            created_at timestamp NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id')
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'])
+    op.create_index('ix_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at'])
+    op.execute('CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT')
+    # one partition per month from the oldest row up to two months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            m date;
+            last date := (date_trunc('month', now()) + interval '2 months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()))::date INTO m FROM audit_logs_legacy;
+            WHILE m <= last LOOP
+                EXECUTE format('CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+                               'audit_logs_' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date);
+                m := (m + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    op.execute(f'INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_legacy')
+    op.drop_table('audit_logs_legacy')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if not _is_postgres():
+        # fold the SQLite shards back into the live table
+        shards = [t for t in sa.inspect(bind).get_table_names() if t.startswith('audit_logs_') and t[11:].isdigit()]
+        for name in shards:
+            op.execute(f'INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM {name}')
+            op.drop_table(name)
+        return
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE')
+    op.execute('ALTER TABLE audit_logs RENAME TO audit_logs_partitioned')
+    op.execute('ALTER INDEX ix_audit_logs_created_at RENAME TO ix_audit_logs_partitioned_created_at')
+    op.execute('ALTER INDEX ix_audit_logs_user_id_created_at RENAME TO ix_audit_logs_partitioned_user_id_created_at')
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), primary_key=True, server_default=sa.text("nextval('audit_logs_id_seq')")),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL')),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('target_type', sa.String(length=50), nullable=False),
+        sa.Column('target_id', sa.String(length=255)),
+        sa.Column('details', sa.Text()),
+        sa.Column('ip', sa.String(length=64)),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.execute('ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id')
+    op.execute(f'INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned')
+    # drops every partition with it
+    op.drop_table('audit_logs_partitioned')
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'])
+    op.create_index('ix_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at'])
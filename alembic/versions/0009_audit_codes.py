@@ -0,0 +1,111 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_audit_codes'
+down_revision = '0008_audit_log_partitions'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copies of app.audit.AUDIT_ACTIONS / AUDIT_TARGETS / CN_ACTIONS at this revision
+ACTIONS = {
+    'POST': 1, 'PATCH': 2, 'PUT': 3, 'DELETE': 4, 'GET': 5, 'LOGIN': 6,
+    'CREATE': 7, 'REVIEW': 8, 'UPLOAD': 9, 'ADMIN_UPDATE': 10, 'ADMIN_DELETE': 11,
+}
+TARGETS = {'HTTP': 1, 'User': 2, 'Application': 3, 'ApplicationAttachment': 4, 'Customer': 5, 'Reason': 6}
+LABELS = {
+    'POST': '新增', 'PATCH': '修改', 'PUT': '修改', 'DELETE': '删除', 'GET': '查询',
+    'LOGIN': '登录', 'CREATE': '新增', 'REVIEW': '审核', 'UPLOAD': '上传附件',
+}
+# Older free-text names are filed from here up, clear of codes the registry hands out next
+LEGACY_CODE_BASE = 1000
+# Rows stored the translated label; labels shared by two actions resolve by row kind
+HTTP_LABELS = {'新增': 'POST', '修改': 'PATCH', '删除': 'DELETE'}
+OTHER_LABELS = {'新增': 'CREATE', '修改': 'PATCH', '删除': 'DELETE', '查询': 'GET', '登录': 'LOGIN', '审核': 'REVIEW', '上传附件': 'UPLOAD'}
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _audit_tables(bind):
+    # audit_logs plus, on SQLite, its monthly shard tables
+    if _is_postgres():
+        return ['audit_logs']
+    names = sa.inspect(bind).get_table_names()
+    return ['audit_logs'] + sorted(t for t in names if t.startswith('audit_logs_') and t[11:].isdigit())
+
+
+def upgrade():
+    bind = op.get_bind()
+    codes = op.create_table(
+        'audit_codes',
+        sa.Column('kind', sa.String(length=10), primary_key=True),
+        sa.Column('code', sa.SmallInteger(), primary_key=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('label', sa.String(length=50)),
+        sa.UniqueConstraint('kind', 'name', name='uq_audit_codes_kind_name'),
+    )
+    actions, targets = dict(ACTIONS), dict(TARGETS)
+    tables = _audit_tables(bind)
+
+    def legacy_code(codes):
+        return max([c for c in codes.values() if c >= LEGACY_CODE_BASE], default=LEGACY_CODE_BASE - 1) + 1
+
+    # Names outside the fixed sets (older free-text rows) get codes of their own
+    for table in tables:
+        for (name,) in bind.execute(sa.text(f'SELECT DISTINCT target_type FROM {table}')):
+            if name not in targets:
+                targets[name] = legacy_code(targets)
+        for (label,) in bind.execute(sa.text(f'SELECT DISTINCT action FROM {table}')):
+            if label not in HTTP_LABELS and label not in OTHER_LABELS and label not in actions:
+                actions[label] = legacy_code(actions)
+    op.bulk_insert(codes, [{'kind': 'action', 'code': c, 'name': n, 'label': LABELS.get(n)} for n, c in actions.items()]
+                   + [{'kind': 'target', 'code': c, 'name': n, 'label': None} for n, c in targets.items()])
+
+    for table in tables:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column('action_code', sa.SmallInteger(), nullable=True))
+            batch.add_column(sa.Column('target_code', sa.SmallInteger(), nullable=True))
+            batch.add_column(sa.Column('route_code', sa.SmallInteger(), nullable=True))
+        for name, code in targets.items():
+            bind.execute(sa.text(f'UPDATE {table} SET target_code = :c WHERE target_type = :n'), {'c': code, 'n': name})
+        for label, name in HTTP_LABELS.items():
+            bind.execute(sa.text(f"UPDATE {table} SET action_code = :c WHERE action = :l AND target_type = 'HTTP'"), {'c': actions[name], 'l': label})
+        for label, name in OTHER_LABELS.items():
+            bind.execute(sa.text(f'UPDATE {table} SET action_code = :c WHERE action = :l AND action_code IS NULL'), {'c': actions[name], 'l': label})
+        for name, code in actions.items():
+            bind.execute(sa.text(f'UPDATE {table} SET action_code = :c WHERE action = :n AND action_code IS NULL'), {'c': code, 'n': name})
+        # HTTP rows written before this revision keep their raw path in target_id (route_code NULL)
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column('action_code', existing_type=sa.SmallInteger(), nullable=False)
+            batch.alter_column('target_code', existing_type=sa.SmallInteger(), nullable=False)
+            batch.drop_column('action')
+            batch.drop_column('target_type')
+        op.create_index(f'ix_{table}_action_code_created_at', table, ['action_code', 'created_at'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in _audit_tables(bind):
+        op.drop_index(f'ix_{table}_action_code_created_at', table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column('action', sa.String(length=50), nullable=True))
+            batch.add_column(sa.Column('target_type', sa.String(length=50), nullable=True))
+        bind.execute(sa.text(
+            f"UPDATE {table} SET "
+            f"action = (SELECT coalesce(label, name) FROM audit_codes WHERE kind = 'action' AND code = {table}.action_code), "
+            f"target_type = (SELECT name FROM audit_codes WHERE kind = 'target' AND code = {table}.target_code)"
+        ))
+        # route templates cannot be turned back into concrete paths; keep the template
+        bind.execute(sa.text(
+            f"UPDATE {table} SET target_id = (SELECT name FROM audit_codes WHERE kind = 'route' AND code = {table}.route_code) "
+            f"WHERE route_code IS NOT NULL"
+        ))
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column('action', existing_type=sa.String(length=50), nullable=False)
+            batch.alter_column('target_type', existing_type=sa.String(length=50), nullable=False)
+            batch.drop_column('action_code')
+            batch.drop_column('target_code')
+            batch.drop_column('route_code')
+    op.drop_table('audit_codes')
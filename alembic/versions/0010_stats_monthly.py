@@ -0,0 +1,39 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010_stats_monthly'
+down_revision = '0009_audit_codes'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    op.create_table(
+        'stats_monthly',
+        sa.Column('year', sa.Integer(), primary_key=True),
+        sa.Column('month', sa.Integer(), primary_key=True),
+        sa.Column('industry', sa.String(length=100), primary_key=True),
+        sa.Column('region', sa.String(length=100), primary_key=True),
+        sa.Column('type', sa.String(length=20), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Backfill from the approved applications (same as app.stats_rollup.rebuild)
+    if _is_postgres():
+        year, month = 'EXTRACT(YEAR FROM a.reviewed_at)::int', 'EXTRACT(MONTH FROM a.reviewed_at)::int'
+    else:
+        year, month = "CAST(strftime('%Y', a.reviewed_at) AS INTEGER)", "CAST(strftime('%m', a.reviewed_at) AS INTEGER)"
+    op.execute(
+        'INSERT INTO stats_monthly (year, month, industry, region, type, count) '
+        f"SELECT {year}, {month}, coalesce(c.industry, ''), coalesce(c.region, ''), a.type, count(*) "
+        'FROM applications a JOIN customers c ON c.id = a.customer_id '
+        "WHERE a.status = 'APPROVED' AND a.reviewed_at IS NOT NULL "
+        f"GROUP BY {year}, {month}, coalesce(c.industry, ''), coalesce(c.region, ''), a.type"
+    )
+
+
+def downgrade():
+    op.drop_table('stats_monthly')
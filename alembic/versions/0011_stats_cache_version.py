@@ -0,0 +1,16 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011_stats_cache_version'
+down_revision = '0010_stats_monthly'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    versions = sa.table('cache_versions', sa.column('name', sa.String), sa.column('version', sa.Integer))
+    op.bulk_insert(versions, [{'name': 'stats', 'version': 0}])
+
+
+def downgrade():
+    op.execute("DELETE FROM cache_versions WHERE name = 'stats'")
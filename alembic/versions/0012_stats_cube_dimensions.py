@@ -0,0 +1,63 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0012_stats_cube_dimensions'
+down_revision = '0011_stats_cache_version'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _month_parts():
+    if _is_postgres():
+        return 'EXTRACT(YEAR FROM a.reviewed_at)::int', 'EXTRACT(MONTH FROM a.reviewed_at)::int'
+    return "CAST(strftime('%Y', a.reviewed_at) AS INTEGER)", "CAST(strftime('%m', a.reviewed_at) AS INTEGER)"
+
+
+def _create_and_backfill(keys):
+    # stats_monthly is derived data: recreate it with the new key and recount
+    op.drop_table('stats_monthly')
+    cols = [
+        sa.Column('year', sa.Integer(), primary_key=True),
+        sa.Column('month', sa.Integer(), primary_key=True),
+        sa.Column('industry', sa.String(length=100), primary_key=True),
+        sa.Column('region', sa.String(length=100), primary_key=True),
+        sa.Column('type', sa.String(length=20), primary_key=True),
+    ]
+    if 'severity' in keys:
+        cols += [
+            sa.Column('severity', sa.String(length=10), primary_key=True),
+            sa.Column('reason_id', sa.Integer(), primary_key=True),
+        ]
+    op.create_table('stats_monthly', *cols, sa.Column('count', sa.Integer(), nullable=False, server_default='0'))
+    year, month = _month_parts()
+    exprs = {
+        'year': year,
+        'month': month,
+        'industry': "coalesce(c.industry, '')",
+        'region': "coalesce(c.region, '')",
+        'type': 'a.type',
+        'severity': "coalesce(a.severity, '')",
+        'reason_id': 'coalesce(a.reason_id, 0)',
+    }
+    select_list = ', '.join(exprs[k] for k in keys)
+    op.execute(
+        f"INSERT INTO stats_monthly ({', '.join(keys)}, count) "
+        f'SELECT {select_list}, count(*) '
+        'FROM applications a JOIN customers c ON c.id = a.customer_id '
+        "WHERE a.status = 'APPROVED' AND a.reviewed_at IS NOT NULL "
+        f'GROUP BY {select_list}'
+    )
+    # Drop every worker's cached stats responses
+    op.execute("UPDATE cache_versions SET version = version + 1 WHERE name = 'stats'")
+
+
+def upgrade():
+    _create_and_backfill(['year', 'month', 'industry', 'region', 'type', 'severity', 'reason_id'])
+
+
+def downgrade():
+    _create_and_backfill(['year', 'month', 'industry', 'region', 'type'])
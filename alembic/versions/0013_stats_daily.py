@@ -0,0 +1,38 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0013_stats_daily'
+down_revision = '0012_stats_cube_dimensions'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    op.create_table(
+        'stats_daily',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('industry', sa.String(length=100), primary_key=True),
+        sa.Column('region', sa.String(length=100), primary_key=True),
+        sa.Column('type', sa.String(length=20), primary_key=True),
+        sa.Column('severity', sa.String(length=10), primary_key=True),
+        sa.Column('reason_id', sa.Integer(), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Backfill from the approved applications (same as app.stats_rollup.rebuild)
+    day = 'a.reviewed_at::date' if _is_postgres() else 'date(a.reviewed_at)'
+    group = f"{day}, coalesce(c.industry, ''), coalesce(c.region, ''), a.type, coalesce(a.severity, ''), coalesce(a.reason_id, 0)"
+    op.execute(
+        'INSERT INTO stats_daily (day, industry, region, type, severity, reason_id, count) '
+        f'SELECT {group}, count(*) '
+        'FROM applications a JOIN customers c ON c.id = a.customer_id '
+        "WHERE a.status = 'APPROVED' AND a.reviewed_at IS NOT NULL "
+        f'GROUP BY {group}'
+    )
+
+
+def downgrade():
+    op.drop_table('stats_daily')
@@ -0,0 +1,65 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0014_customer_default_periods'
+down_revision = '0013_stats_daily'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'customer_default_periods',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('customer_id', sa.Integer(), sa.ForeignKey('customers.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('ended_at', sa.DateTime(), nullable=True),
+        sa.Column('start_application_id', sa.Integer(), nullable=True),
+        sa.Column('end_application_id', sa.Integer(), nullable=True),
+    )
+    op.create_index('ix_customer_default_periods_started_at_ended_at', 'customer_default_periods', ['started_at', 'ended_at'])
+    op.create_index('ix_customer_default_periods_customer_id_started_at', 'customer_default_periods', ['customer_id', 'started_at'])
+    op.create_index(
+        'uq_customer_default_periods_open', 'customer_default_periods', ['customer_id'], unique=True,
+        sqlite_where=sa.text('ended_at IS NULL'), postgresql_where=sa.text('ended_at IS NULL'),
+    )
+
+    # Backfill by replaying approved DEFAULT/REBIRTH applications in review order
+    # (same as app.default_periods.rebuild)
+    applications = sa.table(
+        'applications',
+        sa.column('id', sa.Integer), sa.column('customer_id', sa.Integer), sa.column('type', sa.String),
+        sa.column('status', sa.String), sa.column('reviewed_at', sa.DateTime),
+    )
+    a = applications.c
+    apps = op.get_bind().execute(
+        sa.select(a.id, a.customer_id, a.type, a.reviewed_at)
+        .where(a.status == 'APPROVED', a.type.in_(['DEFAULT', 'REBIRTH']), a.reviewed_at.is_not(None))
+        .order_by(a.reviewed_at, a.id)
+    )
+    open_periods = {}
+    periods = []
+    for app_id, customer_id, type_, reviewed_at in apps:
+        current = open_periods.get(customer_id)
+        if type_ == 'DEFAULT' and current is None:
+            current = {
+                'customer_id': customer_id, 'started_at': reviewed_at, 'start_application_id': app_id,
+                'ended_at': None, 'end_application_id': None,
+            }
+            open_periods[customer_id] = current
+            periods.append(current)
+        elif type_ == 'REBIRTH' and current is not None:
+            current['ended_at'] = reviewed_at
+            current['end_application_id'] = app_id
+            del open_periods[customer_id]
+    if periods:
+        table = sa.table(
+            'customer_default_periods',
+            sa.column('customer_id', sa.Integer), sa.column('started_at', sa.DateTime), sa.column('ended_at', sa.DateTime),
+            sa.column('start_application_id', sa.Integer), sa.column('end_application_id', sa.Integer),
+        )
+        op.bulk_insert(table, periods)
+
+
+def downgrade():
+    op.drop_table('customer_default_periods')
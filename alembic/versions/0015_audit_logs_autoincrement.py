@@ -0,0 +1,37 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0015_audit_logs_autoincrement'
+down_revision = '0014_customer_default_periods'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _tables():
+    # the live table and the shards app.audit_partitions.rotate moved closed months into
+    names = sa.inspect(op.get_bind()).get_table_names()
+    return ['audit_logs'] + [t for t in names if t.startswith('audit_logs_') and t[11:].isdigit()]
+
+
+def upgrade():
+    # PostgreSQL ids come from audit_logs_id_seq, which never goes back
+    if _is_postgres():
+        return
+    # Without AUTOINCREMENT SQLite restarts at max(id) + 1 of the live table only,
+    # which is 1 again once rotate() has moved every row out
+    with op.batch_alter_table('audit_logs', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    top = ' UNION ALL '.join(f'SELECT max(id) AS id FROM {t}' for t in _tables())
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'audit_logs'")
+    op.execute(f"INSERT INTO sqlite_sequence (name, seq) SELECT 'audit_logs', coalesce(max(id), 0) FROM ({top})")
+
+
+def downgrade():
+    if _is_postgres():
+        return
+    with op.batch_alter_table('audit_logs', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
@@ -1,9 +1,21 @@
-from typing import Optional
+import asyncio
+import logging
+import random
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 from fastapi import Request
-from sqlalchemy.orm import Session
-from app.models import AuditLog, User
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
+from app.models import AuditCode, AuditLog, User
 from app.db.database import SessionLocal
-from app.security import decode_token
+
+
+logger = logging.getLogger(__name__)
 
 
 CN_ACTIONS = {
@@ -19,37 +31,377 @@ CN_ACTIONS = {
 }
 
 
+# Codes stored in audit_logs.action_code / target_code, mirrored into audit_codes
+# by migration 0009. Append only: never renumber or reuse a code, and stay below
+# LEGACY_CODE_BASE, where 0009 filed older free-text actions/targets.
+AUDIT_ACTIONS = {
+    "POST": 1,
+    "PATCH": 2,
+    "PUT": 3,
+    "DELETE": 4,
+    "GET": 5,
+    "LOGIN": 6,
+    "CREATE": 7,
+    "REVIEW": 8,
+    "UPLOAD": 9,
+    "ADMIN_UPDATE": 10,
+    "ADMIN_DELETE": 11,
+}
+AUDIT_TARGETS = {
+    "HTTP": 1,
+    "User": 2,
+    "Application": 3,
+    "ApplicationAttachment": 4,
+    "Customer": 5,
+    "Reason": 6,
+}
+
+LEGACY_CODE_BASE = 1000
+
+_PATH_PARAM = re.compile(r"{[^}]+}")
+
+
+def ensure_audit_codes(db: Session):
+    """Add any action/target codes missing from audit_codes (e.g. schema from create_all).
+
+    Raises RuntimeError if the table disagrees with the registry, since rows
+    would then decode under the wrong name.
+    """
+    stored = db.execute(select(AuditCode.kind, AuditCode.code, AuditCode.name).where(AuditCode.kind.in_(["action", "target"]))).all()
+    names = {(k, c): n for k, c, n in stored}
+    codes = {(k, n): c for k, c, n in stored}
+    rows = [{"kind": "action", "code": c, "name": n, "label": CN_ACTIONS.get(n)} for n, c in AUDIT_ACTIONS.items()]
+    rows += [{"kind": "target", "code": c, "name": n, "label": None} for n, c in AUDIT_TARGETS.items()]
+    for r in rows:
+        name = names.get((r["kind"], r["code"]), r["name"])
+        code = codes.get((r["kind"], r["name"]), r["code"])
+        if name != r["name"] or code != r["code"]:
+            raise RuntimeError(
+                f"audit_codes conflict for {r['kind']} {r['name']!r} (code {r['code']}): "
+                f"code {r['code']} is stored as {name!r}, {r['name']!r} as code {code}"
+            )
+    missing = [r for r in rows if (r["kind"], r["code"]) not in names]
+    if missing:
+        db.execute(insert(AuditCode), missing)
+    db.commit()
+
+
+class RouteCodes:
+    """Codes of route templates (kind "route" in audit_codes), registered at startup."""
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, template: Optional[str]) -> Optional[int]:
+        return self._codes.get(template) if template else None
+
+    def register(self, db: Session, templates: Iterable[str], attempts: int = 3):
+        templates = list(dict.fromkeys(templates))
+        for attempt in range(attempts):
+            existing = dict(db.execute(select(AuditCode.name, AuditCode.code).where(AuditCode.kind == "route")).all())
+            missing = [t for t in templates if t not in existing]
+            if not missing:
+                break
+            first = max(existing.values(), default=0) + 1
+            try:
+                db.execute(insert(AuditCode), [{"kind": "route", "code": first + i, "name": t} for i, t in enumerate(missing)])
+                db.commit()
+            except IntegrityError:
+                # another worker allocated the same codes first; re-read and retry
+                db.rollback()
+                if attempt == attempts - 1:
+                    raise
+        with self._lock:
+            self._codes = dict(db.execute(select(AuditCode.name, AuditCode.code).where(AuditCode.kind == "route")).all())
+
+
+route_codes = RouteCodes()
+
+
+def audit_values(user_id: Optional[int], action: str, target_type: str, target_id: Optional[str], details: Optional[str] = None, ip: Optional[str] = None, route: Optional[str] = None) -> dict:
+    # Column values of one AuditLog row, for bulk inserts
+    return {
+        "user_id": user_id,
+        "action_code": AUDIT_ACTIONS[action.upper()],
+        "target_code": AUDIT_TARGETS[target_type],
+        "route_code": route_codes.get(route),
+        "target_id": target_id,
+        "details": details,
+        "ip": ip,
+    }
+
+
 def write_audit(db: Session, user_id: Optional[int], action: str, target_type: str, target_id: Optional[str], details: Optional[str] = None, ip: Optional[str] = None):
-    label = CN_ACTIONS.get(action.upper(), action)
-    log = AuditLog(user_id=user_id, action=label, target_type=target_type, target_id=target_id, details=details, ip=ip)
-    db.add(log)
-
-
-def _extract_user_id_from_request(request: Request, db: Session) -> Optional[int]:
-    # Try from Authorization header
-    auth = request.headers.get("authorization") or request.headers.get("Authorization")
-    if auth and auth.lower().startswith("bearer "):
-        token = auth.split(" ", 1)[1]
-        email = decode_token(token)
-        if email:
-            u = db.query(User).filter(User.email == email).first()
-            return u.id if u else None
+    db.add(AuditLog(**audit_values(user_id, action, target_type, target_id, details, ip)))
+
+
+def client_ip(request: Request) -> Optional[str]:
+    # Handler-audited routes pass this themselves: the middleware row that used to carry it is skipped
+    return request.client.host if request.client else None
+
+
+def action_codes(action: str):
+    """Codes matching an action filter given either as a name (REVIEW) or a label (审核).
+
+    A subquery on audit_codes rather than the registry, so legacy actions filed
+    by migration 0009 stay filterable.
+    """
+    return select(AuditCode.code).where(
+        AuditCode.kind == "action",
+        or_(AuditCode.name.in_({action, action.upper()}), AuditCode.label == action),
+    )
+
+
+def target_codes(target_type: str):
+    """Codes matching a target filter, legacy targets included (see ``action_codes``)."""
+    return select(AuditCode.code).where(AuditCode.kind == "target", AuditCode.name == target_type)
+
+
+def http_path(template: str, params: Optional[str]) -> str:
+    # Inverse of _http_target: put the stored parameters back into the template
+    values = iter((params or "").split("/", max(len(_PATH_PARAM.findall(template)) - 1, 0)))
+    return _PATH_PARAM.sub(lambda _: next(values, ""), template)
+
+
+def decoded_audit_select(src):
+    """SELECT over ``src`` (audit_logs or a union of its shards) with codes and actor resolved."""
+    act, tgt, rte = aliased(AuditCode), aliased(AuditCode), aliased(AuditCode)
+    return (
+        select(
+            src,
+            act.name.label("action_name"), act.label.label("action_label"),
+            tgt.name.label("target_type"), rte.name.label("route"),
+            User.full_name.label("actor_name"), User.email.label("actor_email"),
+        )
+        .outerjoin(act, and_(act.kind == "action", act.code == src.c.action_code))
+        .outerjoin(tgt, and_(tgt.kind == "target", tgt.code == src.c.target_code))
+        .outerjoin(rte, and_(rte.kind == "route", rte.code == src.c.route_code))
+        .outerjoin(User, User.id == src.c.user_id)
+    )
+
+
+def audit_row_out(row) -> dict:
+    # Shape expected by the frontend; row comes from decoded_audit_select
+    if row.route:
+        resource = f"HTTP:{http_path(row.route, row.target_id)}"
+    elif row.target_type:
+        resource = f"{row.target_type}:{row.target_id}"
+    else:
+        resource = row.target_id
+    return {
+        "id": row.id,
+        "timestamp": row.created_at.isoformat() if row.created_at else None,
+        "actor": row.actor_name or row.actor_email,
+        "action": row.action_label or row.action_name,
+        "resource": resource,
+        "ip": row.ip,
+    }
+
+
+def _http_target(request: Request) -> Tuple[Optional[str], Optional[str]]:
+    # Route template plus its path parameters, e.g. ("/applications/{app_id}/review", "42");
+    # the raw path when no registered route matched
+    template = getattr(request.scope.get("route"), "path", None)
+    if route_codes.get(template):
+        return template, "/".join(str(v) for v in request.path_params.values()) or None
+    return None, request.url.path
+
+
+def _extract_user_id_from_request(request: Request) -> Optional[int]:
+    # Set by get_current_user; requests that never authenticated are logged anonymously
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal.id
     # Fallback: custom state
-    if hasattr(request.state, "user_id"):
-        return getattr(request.state, "user_id")
-    return None
+    return getattr(request.state, "user_id", None)
 
 
-async def audit_middleware(request: Request, call_next):
-    response = await call_next(request)
-    if request.method in {"POST", "PATCH", "DELETE"}:
+class AuditWriter:
+    """Bounded in-process queue of audit rows, bulk-inserted by a background task.
+
+    Rows go out when ``batch_size`` have accumulated or ``flush_interval``
+    seconds after the first one of a batch arrived, whichever comes first.
+    When the queue is full, ``enqueue`` waits up to ``enqueue_timeout`` seconds
+    and then drops the row, so a slow database slows requests down a little
+    instead of growing memory without bound.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float, enqueue_timeout: float):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        # The queue binds to the running loop, so create it here rather than at import
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write everything still queued, then stop the background task."""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def flush(self):
+        """Wait until every row queued so far has been written (or dropped)."""
+        if self.running:
+            await self._queue.join()
+
+    async def enqueue(self, values: dict):
+        if not self.running:
+            # Not started (e.g. scripts); write inline
+            await run_in_threadpool(self._insert, [values])
+            return
+        try:
+            self._queue.put_nowait(values)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(values), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[dict] = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                row = await self._get(timeout)
+                if row is None:
+                    break
+                batch.append(row)
+            try:
+                await run_in_threadpool(self._insert, batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception("Failed to write %d audit rows", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _get(self, timeout: float) -> Optional[dict]:
+        # Not wait_for: it can time out after get() already took a row, losing the
+        # row and its task_done(), and stop() would then wait on join() forever
+        getter = asyncio.ensure_future(self._queue.get())
+        try:
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+        finally:
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if getter in done else None
+
+    def _insert(self, rows: List[dict]):
         db: Session = SessionLocal()
         try:
-            user_id = _extract_user_id_from_request(request, db)
-            ip = request.client.host if request.client else None
-            path = str(request.url.path)
-            write_audit(db, user_id, request.method, "HTTP", path, None, ip)
+            # tagged so SQL logs (and statement counters) can tell background writes apart
+            db.connection(execution_options={"logging_token": "audit_writer"})
+            db.execute(insert(AuditLog), rows)
             db.commit()
         finally:
             db.close()
+        self.written += len(rows)
+        self.batches += 1
+
+
+audit_writer = AuditWriter(
+    maxsize=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    enqueue_timeout=settings.audit_enqueue_timeout_seconds,
+)
+
+
+@dataclass(frozen=True)
+class AuditPolicy:
+    """How audit_middleware treats the generic HTTP row of one route."""
+    # The handler writes its own, more specific row when it succeeds and must
+    # record client_ip(request) on it; failed attempts (4xx/5xx) still get the generic row
+    handler_audited: bool = False
+    # Fraction of requests that get a row; sampled rows note the rate in details
+    sample_rate: float = 1.0
+    exclude: bool = False
+
+
+DEFAULT_POLICY = AuditPolicy()
+HANDLER_AUDITED = AuditPolicy(handler_audited=True)
+
+# Every exception to "one HTTP row per POST/PATCH/DELETE", keyed by (method, route template)
+AUDIT_POLICIES: Dict[Tuple[str, str], AuditPolicy] = {
+    ("POST", "/auth/token"): HANDLER_AUDITED,
+    ("POST", "/applications/"): HANDLER_AUDITED,
+    ("POST", "/applications/bulk"): HANDLER_AUDITED,
+    ("PATCH", "/applications/{app_id}"): HANDLER_AUDITED,
+    ("DELETE", "/applications/{app_id}"): HANDLER_AUDITED,
+    ("POST", "/applications/{app_id}/attachments"): HANDLER_AUDITED,
+    ("POST", "/applications/{app_id}/review"): HANDLER_AUDITED,
+    ("POST", "/applications/review/batch"): HANDLER_AUDITED,
+    # high volume, little forensic value
+    ("POST", "/applications/queue/claim"): AuditPolicy(sample_rate=0.1),
+    ("DELETE", "/applications/{app_id}/claim"): AuditPolicy(sample_rate=0.1),
+    ("POST", "/notifications/{nid}/read"): AuditPolicy(sample_rate=0.1),
+}
+
+AUDITED_METHODS = {"POST", "PATCH", "DELETE"}
+
+
+def audit_policy(method: str, template: Optional[str]) -> AuditPolicy:
+    return AUDIT_POLICIES.get((method, template), DEFAULT_POLICY)
+
+
+def _http_audit_details(request: Request, status_code: int) -> Tuple[bool, Optional[str]]:
+    # (write a row?, details) for the generic row of this request
+    if request.method not in AUDITED_METHODS:
+        return False, None
+    if any(request.url.path.startswith(p) for p in settings.audit_exclude_paths):
+        return False, None
+    policy = audit_policy(request.method, getattr(request.scope.get("route"), "path", None))
+    if policy.exclude or (policy.handler_audited and status_code < 400):
+        return False, None
+    if policy.sample_rate < 1:
+        if random.random() >= policy.sample_rate:
+            return False, None
+        return True, f"sampled={policy.sample_rate}"
+    return True, None
+
+
+async def audit_middleware(request: Request, call_next):
+    response = await call_next(request)
+    audited, details = _http_audit_details(request, response.status_code)
+    if audited:
+        user_id = _extract_user_id_from_request(request)
+        ip = client_ip(request)
+        route, params = _http_target(request)
+        await audit_writer.enqueue(audit_values(user_id, request.method, "HTTP", params, details, ip, route))
     return response
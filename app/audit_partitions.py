@@ -0,0 +1,213 @@
+"""Monthly partitions of ``audit_logs`` and the retention job built on them.
+
+On PostgreSQL ``audit_logs`` is natively RANGE-partitioned on ``created_at``
+(migration 0008): one child table ``audit_logs_YYYYMM`` per month plus
+``audit_logs_default`` for rows no month covers; ``ensure_partitions`` moves
+those into their month's table once it exists. On SQLite the live table keeps
+taking inserts and ``rotate`` moves each closed month into a shard table with
+the same ``audit_logs_YYYYMM`` name. Retention then works the same on both:
+whole months past the cutoff are archived to gzipped NDJSON and dropped.
+"""
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.orm import Session
+from app.audit import decoded_audit_select
+from app.core.config import settings
+from app.export import gzip_chunks, ndjson_chunks, stream_rows
+from app.models import AuditLog
+
+
+logger = logging.getLogger(__name__)
+
+PARTITION_RE = re.compile(r"^audit_logs_(\d{6})$")
+DEFAULT_PARTITION = "audit_logs_default"
+
+
+def month_floor(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, n: int) -> datetime:
+    y, m = divmod(dt.year * 12 + dt.month - 1 + n, 12)
+    return datetime(y, m + 1, 1)
+
+
+def month_key(dt: datetime) -> str:
+    return f"{dt.year:04d}{dt.month:02d}"
+
+
+def key_start(key: str) -> datetime:
+    return datetime(int(key[:4]), int(key[4:]), 1)
+
+
+def partition_name(key: str) -> str:
+    return f"audit_logs_{key}"
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def list_partitions(db: Session) -> List[str]:
+    """Month keys (``YYYYMM``) that currently have their own table, oldest first."""
+    if _is_postgres(db):
+        names = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'audit_logs'"
+        )).scalars()
+    else:
+        names = db.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'audit_logs_%'")).scalars()
+    return sorted(m.group(1) for m in map(PARTITION_RE.match, names) if m)
+
+
+def _shard_table(key: str) -> Table:
+    # Same columns as audit_logs, without the users FK (shards only age out)
+    cols = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in AuditLog.__table__.columns]
+    name = partition_name(key)
+    return Table(
+        name, MetaData(), *cols,
+        Index(f"ix_{name}_created_at", "created_at"),
+        Index(f"ix_{name}_user_id_created_at", "user_id", "created_at"),
+        Index(f"ix_{name}_action_code_created_at", "action_code", "created_at"),
+    )
+
+
+def _attach_month(db: Session, start: datetime):
+    # A month cannot be attached while DEFAULT holds rows for it: move them over
+    # first, with DEFAULT locked so no new ones arrive in between
+    name = partition_name(month_key(start))
+    lo, hi = f"{start:%Y-%m-%d}", f"{add_months(start, 1):%Y-%m-%d}"
+    db.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+    db.execute(text(f"CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= '{lo}' AND created_at < '{hi}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    db.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+
+
+def ensure_partitions(db: Session, now: Optional[datetime] = None, months_ahead: Optional[int] = None):
+    """Create the current and the next few month partitions (PostgreSQL only).
+
+    Rows that landed in the DEFAULT partition, for these or any other months,
+    are moved into their own month's partition, so retention archives them like
+    the rest. A month that fails is logged and skipped rather than aborting the
+    others.
+    """
+    if not _is_postgres(db):
+        return
+    now = now or datetime.utcnow()
+    months_ahead = settings.audit_partitions_ahead if months_ahead is None else months_ahead
+    months = {add_months(month_floor(now), i) for i in range(months_ahead + 1)}
+    months.update(db.execute(text(f"SELECT DISTINCT date_trunc('month', created_at) FROM {DEFAULT_PARTITION}")).scalars())
+    existing = set(list_partitions(db))
+    db.commit()
+    for start in sorted(months):
+        if month_key(start) in existing:
+            continue
+        try:
+            _attach_month(db, start)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning("Could not create audit_logs partition for %s", month_key(start), exc_info=True)
+
+
+def rotate(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """Move closed months out of the live SQLite table into shard tables."""
+    if _is_postgres(db):
+        return []
+    live = AuditLog.__table__
+    boundary = month_floor(now or datetime.utcnow())
+    oldest = db.execute(select(func.min(live.c.created_at)).where(live.c.created_at < boundary)).scalar()
+    moved = []
+    month = month_floor(oldest) if oldest else boundary
+    while month < boundary:
+        end = add_months(month, 1)
+        in_month = (live.c.created_at >= month) & (live.c.created_at < end)
+        if db.execute(select(live.c.id).where(in_month).limit(1)).first():
+            shard = _shard_table(month_key(month))
+            shard.create(db.connection(), checkfirst=True)
+            db.execute(insert(shard).from_select([c.name for c in live.columns], select(*live.columns).where(in_month)))
+            db.execute(delete(live).where(in_month))
+            moved.append(month_key(month))
+        month = end
+    db.commit()
+    return moved
+
+
+def audit_source(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Selectable holding the audit rows in [start, end], touching only the months involved.
+
+    PostgreSQL prunes partitions itself from the ``created_at`` predicates, so
+    this is the parent table there. On SQLite it is the live table UNION ALL the
+    shard tables that overlap the range.
+    """
+    live = AuditLog.__table__
+    if _is_postgres(db):
+        return live
+    keys = [
+        k for k in list_partitions(db)
+        if (end is None or key_start(k) <= end) and (start is None or add_months(key_start(k), 1) > start)
+    ]
+    if not keys:
+        return live
+    shards = [select(*_shard_table(k).columns) for k in keys]
+    return union_all(select(*live.columns), *shards).subquery("audit_logs")
+
+
+def _archived_row(row) -> dict:
+    # Archives outlive the code tables, so store names rather than codes
+    return {
+        "id": row.id,
+        "created_at": row.created_at,
+        "user_id": row.user_id,
+        "action": row.action_name,
+        "target_type": row.target_type,
+        "route": row.route,
+        "target_id": row.target_id,
+        "details": row.details,
+        "ip": row.ip,
+    }
+
+
+def archive_partition(db: Session, key: str, archive_dir: str) -> Path:
+    """Write one month to ``<archive_dir>/audit_logs_YYYYMM.ndjson.gz``, then drop its table."""
+    name = partition_name(key)
+    path = Path(archive_dir) / f"{name}.ndjson.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    table = _shard_table(key)
+    batches = stream_rows(decoded_audit_select(table).order_by(table.c.created_at, table.c.id))
+    with open(tmp, "wb") as f:
+        for chunk in gzip_chunks(ndjson_chunks(batches, _archived_row)):
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    # Only drop once the archive is durable
+    os.replace(tmp, path)
+    if _is_postgres(db):
+        db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+    db.execute(text(f"DROP TABLE {name}"))
+    db.commit()
+    return path
+
+
+def apply_retention(db: Session, now: Optional[datetime] = None, months: Optional[int] = None, archive_dir: Optional[str] = None) -> List[str]:
+    """Rotate/create partitions, then archive and drop every month older than ``months``."""
+    now = now or datetime.utcnow()
+    months = settings.audit_retention_months if months is None else months
+    archive_dir = archive_dir or settings.audit_archive_dir
+    rotate(db, now)
+    ensure_partitions(db, now)
+    cutoff = month_key(add_months(month_floor(now), -months))
+    expired = [k for k in list_partitions(db) if k < cutoff]
+    for key in expired:
+        archive_partition(db, key, archive_dir)
+    return expired
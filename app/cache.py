@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from app.models import CacheVersion
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Session.info key holding the cache names to bump once the session commits
+_PENDING_BUMPS = "cache_version_bumps"
+
+# Live VersionedCache instances by name, so a bump also reaches this process's caches at once
+_instances: "weakref.WeakValueDictionary[int, VersionedCache]" = weakref.WeakValueDictionary()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache(TTLCache):
+    """TTLCache kept coherent across worker processes by a version row in ``cache_versions``.
+
+    Writers call ``bump_version`` during the transaction that makes the change;
+    the counter moves right after it commits. Every worker re-reads the version
+    at most once per ``check_interval`` seconds and drops its entries when it
+    moved; this process's caches re-read it on their next sync.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, check_interval: float):
+        super().__init__(maxsize, ttl)
+        self.name = name
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self._checked_at = float("-inf")
+        _instances[id(self)] = self
+
+    def recheck(self):
+        # Make the next sync() read the version regardless of check_interval
+        self._checked_at = float("-inf")
+
+    def sync(self, db: Session):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        current = db.execute(select(CacheVersion.version).where(CacheVersion.name == self.name)).scalar() or 0
+        if current != self.version:
+            self.clear()
+            self.version = current
+
+
+def bump_version(db: Session, name: str):
+    """Invalidate ``name`` in every worker once ``db`` commits; nothing happens on rollback.
+
+    The counter is bumped after the commit in a short transaction of its own, so
+    concurrent writers never queue on the ``cache_versions`` row, and a worker
+    cannot re-read the version before the change it stands for is visible.
+    """
+    db.info.setdefault(_PENDING_BUMPS, set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session):
+    names = session.info.pop(_PENDING_BUMPS, None)
+    if not names:
+        return
+    try:
+        with session.get_bind().begin() as conn:
+            for name in sorted(names):
+                bumped = conn.execute(
+                    update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+                ).rowcount
+                if not bumped:
+                    conn.execute(insert(CacheVersion).values(name=name, version=1))
+    except Exception:
+        # The change itself is committed; other workers catch up when their entries expire
+        logger.exception("Failed to bump cache versions %s", sorted(names))
+    for cache in list(_instances.values()):
+        if cache.name in names:
+            cache.recheck()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_bumps(session: Session):
+    session.info.pop(_PENDING_BUMPS, None)
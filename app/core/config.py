@@ -9,6 +9,10 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
 
+    # Changing the cost rehashes each password transparently on its next login
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+
     admin_default_email: str = "admin@example.com"
     admin_default_password: str = "admin123"
 
@@ -18,6 +22,34 @@ class Settings(BaseSettings):
     operator_default_email: str = "operator@example.com"
     operator_default_password: str = "operator123"
 
+    # Resolved-principal cache used by get_current_user; workers re-check the
+    # shared version counter at most every cache_version_check_seconds
+    principal_cache_size: int = 4096
+    principal_cache_ttl_seconds: int = 60
+    cache_version_check_seconds: float = 2.0
+
+    # Request audit rows are queued and bulk-inserted in the background; when the
+    # queue is full a request waits up to audit_enqueue_timeout_seconds, then drops its row
+    audit_queue_size: int = 10000
+    audit_batch_size: int = 500
+    audit_flush_interval_seconds: float = 1.0
+    audit_enqueue_timeout_seconds: float = 0.05
+    # Path prefixes that never get a generic HTTP audit row (per-route rules: app.audit.AUDIT_POLICIES)
+    audit_exclude_paths: list[str] = []
+
+    # audit_logs is partitioned by month; months older than audit_retention_months
+    # are archived to audit_archive_dir as .ndjson.gz and dropped (scripts/audit_retention.py)
+    audit_retention_months: int = 12
+    audit_archive_dir: str = "./archive/audit"
+    audit_partitions_ahead: int = 2
+
+    # Rendered /stats responses, dropped whenever the stats rollup changes
+    stats_cache_size: int = 256
+    stats_cache_ttl_seconds: int = 600
+
+    # Review queue lease length
+    review_claim_ttl_seconds: int = 15 * 60
+
     # Storage config
     storage_backend: str = "local"  # local | s3
     local_storage_dir: str = "./uploads"
@@ -27,6 +59,16 @@ class Settings(BaseSettings):
     s3_secret_key: str | None = None
     s3_region: str | None = None
     s3_bucket: str | None = None
+    # Uploads are copied in chunks and aborted once they exceed max_upload_bytes; the request
+    # body itself is capped while it is received (app.upload_limit)
+    upload_chunk_size: int = 1024 * 1024
+    max_upload_bytes: int = 50 * 1024 * 1024
+    # S3 switches to multipart upload above the threshold; parts must be >= 5 MiB
+    s3_multipart_threshold: int = 8 * 1024 * 1024
+    s3_multipart_part_size: int = 8 * 1024 * 1024
+    s3_max_pool_connections: int = 20
+    # Threads reserved for storage I/O from async endpoints
+    storage_io_threads: int = 8
 
     class Config:
         env_file = ".env"
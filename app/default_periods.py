@@ -0,0 +1,122 @@
+"""History of customers' default status as ``customer_default_periods`` intervals.
+
+``Customer.is_default`` only holds the current state. Every approval that flips
+it also opens (DEFAULT) or closes (REBIRTH) a period here, in the same
+transaction, so "who was in default at time X" is one indexed range query
+instead of a replay of all approved applications. ``rebuild`` recomputes the
+table, or some customers' rows, from ``applications``.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from app.models import Application, ApplicationStatus, ApplicationType, Customer, CustomerDefaultPeriod
+
+
+GROUPS = {"industry": Customer.industry, "region": Customer.region}
+
+
+def record(db: Session, rows: Iterable):
+    """Apply each customer's deciding approval of a review batch; caller commits.
+
+    ``rows`` hold ``id``, ``type``, ``customer_id`` and ``reviewed_at``, at most
+    one per customer. A DEFAULT opens a period unless one is open already, a
+    REBIRTH closes the open one.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    open_for = set(db.scalars(
+        select(CustomerDefaultPeriod.customer_id)
+        .where(CustomerDefaultPeriod.customer_id.in_({r.customer_id for r in rows}), CustomerDefaultPeriod.ended_at.is_(None))
+    ))
+    opened = [
+        {"customer_id": r.customer_id, "started_at": r.reviewed_at, "start_application_id": r.id}
+        for r in rows if r.type == ApplicationType.default.value and r.customer_id not in open_for
+    ]
+    closed = [
+        {"b_customer_id": r.customer_id, "b_ended_at": r.reviewed_at, "b_application_id": r.id}
+        for r in rows if r.type == ApplicationType.rebirth.value and r.customer_id in open_for
+    ]
+    if opened:
+        db.execute(insert(CustomerDefaultPeriod), opened)
+    if closed:
+        periods = CustomerDefaultPeriod.__table__
+        db.execute(
+            update(periods)
+            .where(periods.c.customer_id == bindparam("b_customer_id"), periods.c.ended_at.is_(None))
+            .values(ended_at=bindparam("b_ended_at"), end_application_id=bindparam("b_application_id")),
+            closed,
+        )
+
+
+def rebuild(db: Session, customer_ids: Optional[Iterable[int]] = None):
+    """Recompute periods by replaying approved applications in review order; caller commits.
+
+    With ``customer_ids`` only those customers' periods are replaced; admin edits
+    and deletes of approved applications use this for the customers they touch.
+    """
+    scope = []
+    if customer_ids is not None:
+        customer_ids = set(customer_ids)
+        scope = [Application.customer_id.in_(customer_ids)]
+    apps = db.execute(
+        select(Application.id, Application.customer_id, Application.type, Application.reviewed_at)
+        .where(
+            Application.status == ApplicationStatus.approved.value,
+            Application.type.in_([ApplicationType.default.value, ApplicationType.rebirth.value]),
+            Application.reviewed_at.is_not(None),
+            *scope,
+        )
+        .order_by(Application.reviewed_at, Application.id)
+    )
+    open_periods: Dict[int, dict] = {}
+    periods = []
+    for a in apps:
+        current = open_periods.get(a.customer_id)
+        if a.type == ApplicationType.default.value and current is None:
+            current = {
+                "customer_id": a.customer_id, "started_at": a.reviewed_at, "start_application_id": a.id,
+                "ended_at": None, "end_application_id": None,
+            }
+            open_periods[a.customer_id] = current
+            periods.append(current)
+        elif a.type == ApplicationType.rebirth.value and current is not None:
+            current["ended_at"] = a.reviewed_at
+            current["end_application_id"] = a.id
+            del open_periods[a.customer_id]
+    stale = delete(CustomerDefaultPeriod)
+    if customer_ids is not None:
+        stale = stale.where(CustomerDefaultPeriod.customer_id.in_(customer_ids))
+    db.execute(stale)
+    if periods:
+        db.execute(insert(CustomerDefaultPeriod), periods)
+
+
+def _counts(db: Session, cond, by: Optional[str]) -> Dict:
+    # Customers matching ``cond``, optionally grouped by their current industry/region, in one query
+    n = func.count(func.distinct(CustomerDefaultPeriod.customer_id))
+    if by is None:
+        total = db.execute(select(n).where(cond)).scalar() or 0
+        return {"total": total, "groups": []}
+    col = GROUPS[by]
+    rows = db.execute(
+        select(col, n).select_from(CustomerDefaultPeriod)
+        .join(Customer, Customer.id == CustomerDefaultPeriod.customer_id)
+        .where(cond)
+        .group_by(col)
+    ).all()
+    groups = sorted(({by: g or "N/A", "count": c} for g, c in rows), key=lambda x: x[by])
+    return {"total": sum(x["count"] for x in groups), "groups": groups}
+
+
+def snapshot(db: Session, at: datetime, by: Optional[str] = None) -> Dict:
+    """Customers in default at ``at``."""
+    cond = (CustomerDefaultPeriod.started_at <= at) & or_(CustomerDefaultPeriod.ended_at.is_(None), CustomerDefaultPeriod.ended_at > at)
+    return {"at": at, "by": by, **_counts(db, cond, by)}
+
+
+def overlapping(db: Session, start: datetime, end: datetime, by: Optional[str] = None) -> Dict:
+    """Customers in default at any time within [start, end)."""
+    cond = (CustomerDefaultPeriod.started_at < end) & or_(CustomerDefaultPeriod.ended_at.is_(None), CustomerDefaultPeriod.ended_at > start)
+    return {"start": start, "end": end, "by": by, **_counts(db, cond, by)}
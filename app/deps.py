@@ -1,6 +1,10 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.cache import VersionedCache, bump_version
+from app.core.config import settings
 from app.db.database import get_db
 from app.models import User, RoleEnum
 from app.security import decode_token
@@ -9,24 +13,51 @@ from app.security import decode_token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by endpoints; a detached snapshot of the User row."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+
+
+# Keyed by token subject (email)
+principal_cache = VersionedCache(
+    "principals",
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+    check_interval=settings.cache_version_check_seconds,
+)
+
+
+def invalidate_principal(db: Session, email: str):
+    """Drop a cached principal here and, via the version counter, in every other worker."""
+    principal_cache.pop(email)
+    bump_version(db, principal_cache.name)
+
+
+def get_current_user(request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
     email = decode_token(token)
     if not email:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not user.is_active:
+    principal_cache.sync(db)
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user:
+            principal = Principal(id=user.id, email=user.email, full_name=user.full_name, role=user.role, is_active=user.is_active)
+            principal_cache.set(email, principal)
+    if not principal or not principal.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive or missing user")
-    # Expose to request.state if present (for audit middleware)
-    try:
-        import contextvars
-        # FastAPI provides request during dependency, but to avoid direct coupling, set on user for middleware via state in endpoints
-    except Exception:
-        pass
-    return user
+    # Shared with audit_middleware through the ASGI scope, so it need not re-authenticate
+    request.state.principal = principal
+    return principal
 
 
 def require_role(*roles: RoleEnum):
-    def checker(user: User = Depends(get_current_user)) -> User:
+    def checker(user: Principal = Depends(get_current_user)) -> Principal:
         if user.role not in [r.value for r in roles]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
         return user
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, Sequence
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+
+
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+EXPORT_BATCH_SIZE = 1000
+
+
+def _plain(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def stream_rows(stmt, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence]:
+    """Yield batches of result rows through a server-side cursor.
+
+    Uses its own session: a StreamingResponse keeps iterating after the request
+    dependencies (and their session) have been torn down.
+    """
+    db: Session = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def csv_chunks(columns: List[str], batches: Iterable[Sequence], to_dict: Callable) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM so spreadsheet tools pick up UTF-8 for Chinese text
+    buf.write("\ufeff")
+    writer.writerow(columns)
+    for batch in batches:
+        for row in batch:
+            d = to_dict(row)
+            writer.writerow([_plain(d[c]) for c in columns])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def ndjson_chunks(batches: Iterable[Sequence], to_dict: Callable) -> Iterator[bytes]:
+    for batch in batches:
+        lines = [json.dumps({k: _plain(v) for k, v in to_dict(row).items()}, ensure_ascii=False) for row in batch]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def export_response(stmt, columns: List[str], to_dict: Callable, fmt: str, gzip: bool, basename: str) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    batches = stream_rows(stmt)
+    chunks = csv_chunks(columns, batches, to_dict) if fmt == "csv" else ndjson_chunks(batches, to_dict)
+    filename = f"{basename}.{fmt}"
+    media_type = EXPORT_FORMATS[fmt]
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -1,3 +1,4 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -8,10 +9,15 @@ from app.core.config import settings
 from app.db.database import Base, engine
 from app.routers import auth, users, customers, reasons, applications, notifications, stats
 from app.routers import audit_logs
-from app.audit import audit_middleware
+from app.audit import audit_middleware, audit_writer, ensure_audit_codes, route_codes
+from app.audit_partitions import ensure_partitions
 from app.models import Reason
+from app.routers.auth import ensure_seed_users
+from app.upload_limit import UploadSizeLimitMiddleware
 
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title=settings.app_name)
 
 app.add_middleware(
@@ -22,6 +28,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.middleware("http")(audit_middleware)
+# Outermost, so oversized upload bodies are cut off before anything reads them
+app.add_middleware(UploadSizeLimitMiddleware)
 
 
 @app.on_event("startup")
@@ -33,6 +41,27 @@ def on_startup():
             subprocess.run(["alembic", "upgrade", "head"], check=True)
     except Exception:
         Base.metadata.create_all(bind=engine)
+    # Seed default accounts once here rather than on every login
+    session = Session(bind=engine)
+    try:
+        ensure_seed_users(session)
+    finally:
+        session.close()
+    # Audit action/target codes, plus codes for the route templates recorded by the audit middleware
+    session = Session(bind=engine)
+    try:
+        ensure_audit_codes(session)
+        route_codes.register(session, [r.path for r in app.routes])
+    finally:
+        session.close()
+    # Make sure the coming months have their audit_logs partitions (PostgreSQL)
+    session = Session(bind=engine)
+    try:
+        ensure_partitions(session)
+    except Exception:
+        logger.exception("Failed to create audit_logs partitions")
+    finally:
+        session.close()
     # Seed default reasons if empty (idempotent)
     try:
         session = Session(bind=engine)
@@ -65,6 +94,16 @@ def on_startup():
         app.mount("/files", StaticFiles(directory=settings.local_storage_dir), name="files")
 
 
+@app.on_event("startup")
+async def start_audit_writer():
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+async def stop_audit_writer():
+    await audit_writer.stop()
+
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(customers.router)
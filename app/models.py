@@ -1,14 +1,20 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
+    SmallInteger,
     String,
     Boolean,
+    Date,
     DateTime,
     ForeignKey,
     Enum as SAEnum,
     Text,
+    Index,
+    UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.db.database import Base
@@ -41,6 +47,43 @@ class Customer(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class CustomerDefaultPeriod(Base):
+    # One row per stretch a customer spent in default: opened by an approved DEFAULT
+    # application, closed by an approved REBIRTH one; ended_at is NULL while still in default
+    __tablename__ = "customer_default_periods"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"))
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    ended_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    start_application_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    end_application_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        # point-in-time / overlap queries: started_at range scan, ended_at checked from the index
+        Index("ix_customer_default_periods_started_at_ended_at", "started_at", "ended_at"),
+        Index("ix_customer_default_periods_customer_id_started_at", "customer_id", "started_at"),
+        # at most one open period per customer
+        Index(
+            "uq_customer_default_periods_open",
+            "customer_id",
+            unique=True,
+            sqlite_where=text("ended_at IS NULL"),
+            postgresql_where=text("ended_at IS NULL"),
+        ),
+    )
+
+
+class CustomerNameGram(Base):
+    # Unigram/bigram tokens of lower-cased customer names for substring search
+    __tablename__ = "customer_name_grams"
+    gram: Mapped[str] = mapped_column(String(2), primary_key=True)
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_customer_name_grams_customer_id", "customer_id"),
+    )
+
+
 class ReasonType(str, Enum):
     default = "DEFAULT"
     rebirth = "REBIRTH"
@@ -86,10 +129,33 @@ class Application(Base):
     reviewed_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     reviewed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Review queue lease: a claim is void once claim_expires_at has passed
+    claimed_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    claim_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     customer = relationship("Customer")
     reason = relationship("Reason")
 
+    __table_args__ = (
+        # admin/reviewer lists: newest first
+        Index("ix_applications_created_at_id", "created_at", "id"),
+        # operator lists: own applications, newest first
+        Index("ix_applications_created_by_created_at", "created_by", "created_at"),
+        # status-filtered lists
+        Index("ix_applications_status_created_at", "status", "created_at"),
+        # stats: approved within a reviewed_at range
+        Index("ix_applications_status_reviewed_at", "status", "reviewed_at"),
+        Index("ix_applications_customer_id", "customer_id"),
+        # review queue: only pending rows, oldest first
+        Index(
+            "ix_applications_pending_queue",
+            "created_at",
+            "id",
+            sqlite_where=text("status = 'PENDING'"),
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
 
 class ApplicationAttachment(Base):
     __tablename__ = "application_attachments"
@@ -97,6 +163,8 @@ class ApplicationAttachment(Base):
     application_id: Mapped[int] = mapped_column(ForeignKey("applications.id", ondelete="CASCADE"))
     filename: Mapped[str] = mapped_column(String(255))
     url: Mapped[str] = mapped_column(String(1024))
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    checksum: Mapped[str | None] = mapped_column(String(64), nullable=True)  # sha256 hex
     uploaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
@@ -104,13 +172,35 @@ class AuditLog(Base):
     __tablename__ = "audit_logs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    action: Mapped[str] = mapped_column(String(50))
-    target_type: Mapped[str] = mapped_column(String(50))
+    # Codes from audit_codes (see app.audit); labels are looked up when reading
+    action_code: Mapped[int] = mapped_column(SmallInteger)
+    target_code: Mapped[int] = mapped_column(SmallInteger)
+    # HTTP rows: the matched route template; target_id then holds its path parameters
+    route_code: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
     target_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     details: Mapped[str | None] = mapped_column(Text, nullable=True)
     ip: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_audit_logs_created_at", "created_at"),
+        Index("ix_audit_logs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_audit_logs_action_code_created_at", "action_code", "created_at"),
+        # rotate() can leave the live table empty; ids must not restart below the shards'
+        {"sqlite_autoincrement": True},
+    )
+
+
+class AuditCode(Base):
+    # Lookup table for the small-integer codes in audit_logs; kind is action | target | route
+    __tablename__ = "audit_codes"
+    kind: Mapped[str] = mapped_column(String(10), primary_key=True)
+    code: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    label: Mapped[str | None] = mapped_column(String(50), nullable=True)
+
+    __table_args__ = (UniqueConstraint("kind", "name", name="uq_audit_codes_kind_name"),)
+
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -119,3 +209,41 @@ class Notification(Base):
     content: Mapped[str] = mapped_column(String(512))
     is_read: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+class CacheVersion(Base):
+    # Per-cache version counters; bumped on writes so every worker drops stale entries
+    __tablename__ = "cache_versions"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class StatsMonthly(Base):
+    # Approved applications counted per review month, customer industry/region, type, severity and reason.
+    # Kept current by app.stats_rollup in the writers' transactions; '' stands for a missing
+    # industry/region/severity and 0 for a missing reason
+    __tablename__ = "stats_monthly"
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    industry: Mapped[str] = mapped_column(String(100), primary_key=True)
+    region: Mapped[str] = mapped_column(String(100), primary_key=True)
+    type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    severity: Mapped[str] = mapped_column(String(10), primary_key=True, default="")
+    reason_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class StatsDaily(Base):
+    # Same counts as stats_monthly per review day; /stats/range sums it into weeks, months or quarters
+    __tablename__ = "stats_daily"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    industry: Mapped[str] = mapped_column(String(100), primary_key=True)
+    region: Mapped[str] = mapped_column(String(100), primary_key=True)
+    type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    severity: Mapped[str] = mapped_column(String(10), primary_key=True, default="")
+    reason_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    count: Mapped[int] = mapped_column(Integer, default=0)
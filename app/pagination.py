@@ -0,0 +1,64 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+COUNT_CAP = 10000
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    # Opaque to clients: base64 of "<iso timestamp>|<id>"
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_before(created_col, id_col, cursor: Optional[str]):
+    """Condition selecting rows strictly after the cursor in (created_at DESC, id DESC) order."""
+    if not cursor:
+        return None
+    created_at, row_id = decode_cursor(cursor)
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < row_id))
+
+
+def next_cursor(rows, limit: int, created_attr: str = "created_at", id_attr: str = "id") -> Optional[str]:
+    # Callers fetch limit + 1 rows; the extra row only signals that another page exists
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(getattr(last, created_attr), getattr(last, id_attr))
+
+
+def estimate_count(db: Session, stmt, cap: int = COUNT_CAP) -> Tuple[int, bool]:
+    """Cheap row count for ``stmt`` (a SELECT without LIMIT): ``(count, exact)``.
+
+    PostgreSQL returns the planner's row estimate from EXPLAIN, which costs no
+    scan. Elsewhere rows are counted, but never more than ``cap`` of them.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        # expanding IN lists are only rendered at execution time unless asked for here
+        compiled = stmt.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+        plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"]), False
+    n = db.execute(select(func.count()).select_from(stmt.limit(cap + 1).subquery())).scalar()
+    return min(n, cap), n <= cap
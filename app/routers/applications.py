@@ -1,6 +1,8 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from app.db.database import get_db
 from app.deps import get_current_user, require_role
@@ -13,40 +15,72 @@ from app.models import (
     Reason,
     RoleEnum,
     Notification,
+    User,
+    AuditLog,
 )
-from app.schemas import ApplicationCreate, ApplicationOut, ReviewAction, ApplicationAttachmentOut, ApplicationDetailOut, ApplicationUpdate
-from app.audit import write_audit
-from app.storage import Storage
+from app.schemas import (
+    ApplicationCreate,
+    ApplicationOut,
+    ReviewAction,
+    ApplicationAttachmentOut,
+    ApplicationDetailOut,
+    ApplicationUpdate,
+    ApplicationPage,
+    ApplicationDetailPage,
+    ApplicationBulkCreate,
+    ApplicationBulkResult,
+    BulkCreated,
+    BulkItemError,
+    BatchReviewAction,
+    BatchReviewResult,
+)
+from app.audit import client_ip, write_audit, audit_values
+from app.storage import StoredObject, UploadTooLarge, get_storage
+from app.core.config import settings
+from app.search import matching_customer_ids
+from app import default_periods, stats_rollup
+from app.export import export_response
+from app.pagination import DEFAULT_PAGE_SIZE, clamp_limit, keyset_before, next_cursor
 
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
+MAX_BULK_ITEMS = 1000
+MAX_CLAIM_ITEMS = 100
 
-def _validate_business_rules(db: Session, payload: ApplicationCreate):
-    customer = db.get(Customer, payload.customer_id)
+
+def _rule_violation(payload: ApplicationCreate, customer, reason) -> Optional[str]:
+    # Pure check over already-loaded rows so single and bulk submission share it
     if not customer:
-        raise HTTPException(status_code=400, detail="Customer not found")
-    reason = db.get(Reason, payload.reason_id)
+        return "Customer not found"
     if not reason or not reason.enabled:
-        raise HTTPException(status_code=400, detail="Invalid reason")
+        return "Invalid reason"
     # reason type must match application type
     if payload.type == ApplicationType.default.value and reason.type != ApplicationType.default.value:
-        raise HTTPException(status_code=400, detail="Reason type mismatch for DEFAULT")
+        return "Reason type mismatch for DEFAULT"
     if payload.type == ApplicationType.rebirth.value and reason.type != ApplicationType.rebirth.value:
-        raise HTTPException(status_code=400, detail="Reason type mismatch for REBIRTH")
+        return "Reason type mismatch for REBIRTH"
     if payload.type == ApplicationType.default.value:
         if customer.is_default:
-            raise HTTPException(status_code=400, detail="Customer already default")
+            return "Customer already default"
     elif payload.type == ApplicationType.rebirth.value:
         if not customer.is_default:
-            raise HTTPException(status_code=400, detail="Customer is not default")
+            return "Customer is not default"
     else:
-        raise HTTPException(status_code=400, detail="Invalid application type")
+        return "Invalid application type"
+    return None
+
+
+def _validate_business_rules(db: Session, payload: ApplicationCreate):
+    error = _rule_violation(payload, db.get(Customer, payload.customer_id), db.get(Reason, payload.reason_id))
+    if error:
+        raise HTTPException(status_code=400, detail=error)
 
 
 @router.post("/", response_model=ApplicationOut, dependencies=[Depends(require_role(RoleEnum.operator, RoleEnum.admin))])
 def create_application(
     payload: ApplicationCreate,
+    request: Request,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -65,112 +99,202 @@ def create_application(
         created_by=user.id,
     )
     db.add(app)
-    write_audit(db, user.id, "CREATE", "Application", None, f"type={payload.type}")
+    db.flush()
+    write_audit(db, user.id, "CREATE", "Application", str(app.id), f"type={payload.type}", client_ip(request))
     db.commit()
     db.refresh(app)
     return app
 
 
-@router.get("/", response_model=List[ApplicationOut])
-def list_applications(
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+def _filtered_applications(
+    q,
+    user,
     customer_name: Optional[str] = None,
     status: Optional[str] = None,
+    type: Optional[str] = None,
+    cursor: Optional[str] = None,
 ):
-    q = db.query(Application)
+    # Works on both ORM queries and select() projections
     if customer_name:
-        q = q.join(Customer).filter(Customer.name.ilike(f"%{customer_name}%"))
+        q = q.filter(Application.customer_id.in_(matching_customer_ids(customer_name)))
     if status:
         q = q.filter(Application.status == status)
+    if type:
+        q = q.filter(Application.type == type)
     # Operators only see their own applications; reviewers/admin see all
     if getattr(user, "role", None) == RoleEnum.operator.value:
         q = q.filter(Application.created_by == user.id)
-    return q.order_by(Application.created_at.desc()).all()
+    after = keyset_before(Application.created_at, Application.id, cursor)
+    if after is not None:
+        q = q.filter(after)
+    return q.order_by(Application.created_at.desc(), Application.id.desc())
+
+
+@router.post("/bulk", response_model=ApplicationBulkResult, dependencies=[Depends(require_role(RoleEnum.operator, RoleEnum.admin))])
+def bulk_create_applications(
+    payload: ApplicationBulkCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    items = payload.items
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    # Two IN-queries prefetch everything the rules need; validation is then in memory
+    customer_ids = {p.customer_id for p in items}
+    reason_ids = {p.reason_id for p in items}
+    customers = {
+        c.id: c for c in db.execute(select(Customer.id, Customer.is_default).where(Customer.id.in_(customer_ids)))
+    }
+    reasons = {
+        r.id: r for r in db.execute(select(Reason.id, Reason.type, Reason.enabled).where(Reason.id.in_(reason_ids)))
+    }
+    errors: List[BulkItemError] = []
+    accepted: List[int] = []
+    rows = []
+    for i, p in enumerate(items):
+        if not p.customer_id or not p.reason_id:
+            error = "customer and reason are required"
+        else:
+            error = _rule_violation(p, customers.get(p.customer_id), reasons.get(p.reason_id))
+        if error:
+            errors.append(BulkItemError(index=i, detail=error))
+            continue
+        accepted.append(i)
+        rows.append({
+            "type": p.type,
+            "customer_id": p.customer_id,
+            "latest_external_rating": p.latest_external_rating,
+            "reason_id": p.reason_id,
+            "severity": p.severity,
+            "remark": p.remark,
+            "status": ApplicationStatus.pending.value,
+            "created_by": user.id,
+        })
+    created: List[BulkCreated] = []
+    if rows:
+        # executemany in one transaction; RETURNING keeps ids aligned with input order
+        ids = db.scalars(
+            insert(Application).returning(Application.id, sort_by_parameter_order=True),
+            rows,
+        ).all()
+        ip = client_ip(request)
+        db.execute(insert(AuditLog), [
+            audit_values(user.id, "CREATE", "Application", str(app_id), f"type={row['type']}", ip)
+            for app_id, row in zip(ids, rows)
+        ])
+        db.commit()
+        created = [BulkCreated(index=i, id=app_id) for i, app_id in zip(accepted, ids)]
+    return ApplicationBulkResult(created=created, errors=errors)
+
+
+@router.get("/", response_model=ApplicationPage)
+def list_applications(
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+    customer_name: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    limit = clamp_limit(limit)
+    q = _filtered_applications(db.query(Application), user, customer_name, status, cursor=cursor)
+    rows = q.limit(limit + 1).all()
+    return ApplicationPage(items=rows[:limit], next_cursor=next_cursor(rows, limit))
 
 
-@router.get("/search", response_model=List[ApplicationDetailOut])
+def _detail_select():
+    # One round trip: customer, reason and both user names come from joins,
+    # returned as plain rows so no ORM identity map is built
+    creator = aliased(User)
+    reviewer = aliased(User)
+    return (
+        select(
+            Application.id,
+            Application.type,
+            Application.status,
+            Application.severity,
+            Application.latest_external_rating,
+            Application.remark,
+            Application.created_at,
+            Application.reviewed_at,
+            Application.customer_id,
+            Customer.name.label("customer_name"),
+            Application.reason_id,
+            Reason.description.label("reason_description"),
+            Application.created_by,
+            creator.full_name.label("created_by_name"),
+            Application.reviewed_by,
+            reviewer.full_name.label("reviewed_by_name"),
+        )
+        .select_from(Application)
+        .outerjoin(Customer, Application.customer_id == Customer.id)
+        .outerjoin(Reason, Application.reason_id == Reason.id)
+        .outerjoin(creator, Application.created_by == creator.id)
+        .outerjoin(reviewer, Application.reviewed_by == reviewer.id)
+    )
+
+
+def _detail_from_row(row) -> ApplicationDetailOut:
+    data = row._asdict()
+    data["customer_name"] = data["customer_name"] or ""
+    data["reason_description"] = data["reason_description"] or ""
+    return ApplicationDetailOut(**data)
+
+
+@router.get("/search", response_model=ApplicationDetailPage)
 def search_applications(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
     customer_name: Optional[str] = None,
     status: Optional[str] = None,
     type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
 ):
-    q = db.query(Application)
-    if customer_name:
-        q = q.join(Customer).filter(Customer.name.ilike(f"%{customer_name}%"))
-    if status:
-        q = q.filter(Application.status == status)
-    if type:
-        q = q.filter(Application.type == type)
-    if getattr(user, "role", None) == RoleEnum.operator.value:
-        q = q.filter(Application.created_by == user.id)
-    apps = q.order_by(Application.created_at.desc()).all()
-    from app.models import User  # local import to avoid circular deps
-    out: List[ApplicationDetailOut] = []
-    for a in apps:
-        customer = db.get(Customer, a.customer_id)
-        reason = db.get(Reason, a.reason_id)
-        cb = db.get(User, a.created_by) if a.created_by else None
-        rb = db.get(User, a.reviewed_by) if a.reviewed_by else None
-        out.append(ApplicationDetailOut(
-            id=a.id,
-            type=a.type,
-            status=a.status,
-            severity=a.severity,
-            latest_external_rating=a.latest_external_rating,
-            remark=a.remark,
-            created_at=a.created_at,
-            reviewed_at=a.reviewed_at,
-            customer_id=a.customer_id,
-            customer_name=customer.name if customer else "",
-            reason_id=a.reason_id,
-            reason_description=reason.description if reason else "",
-            created_by=a.created_by,
-            created_by_name=cb.full_name if cb else None,
-            reviewed_by=a.reviewed_by,
-            reviewed_by_name=rb.full_name if rb else None,
-        ))
-    return out
+    limit = clamp_limit(limit)
+    stmt = _filtered_applications(_detail_select(), user, customer_name, status, type, cursor)
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    return ApplicationDetailPage(
+        items=[_detail_from_row(r) for r in rows[:limit]],
+        next_cursor=next_cursor(rows, limit),
+    )
+
+
+@router.get("/export")
+def export_applications(
+    user=Depends(get_current_user),
+    format: str = "csv",
+    gzip: bool = False,
+    customer_name: Optional[str] = None,
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+):
+    # Same filters and role scoping as /search, streamed without a page limit
+    stmt = _filtered_applications(_detail_select(), user, customer_name, status, type)
+    return export_response(
+        stmt,
+        list(ApplicationDetailOut.model_fields),
+        lambda row: row._asdict(),
+        format,
+        gzip,
+        "applications",
+    )
 
 
 @router.get("/{app_id}", response_model=ApplicationDetailOut)
 def get_application_detail(app_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    app = db.get(Application, app_id)
-    if not app:
+    row = db.execute(_detail_select().where(Application.id == app_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Not found")
     # Operators can only view their own applications
-    if getattr(user, "role", None) == RoleEnum.operator.value and app.created_by != user.id:
+    if getattr(user, "role", None) == RoleEnum.operator.value and row.created_by != user.id:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    customer = db.get(Customer, app.customer_id)
-    reason = db.get(Reason, app.reason_id)
-    # safer: query user names inline to avoid circular import
-    from app.models import User  # local import to avoid circular deps at module import time
-    cb = db.get(User, app.created_by) if app.created_by else None
-    rb = db.get(User, app.reviewed_by) if app.reviewed_by else None
-    return ApplicationDetailOut(
-        id=app.id,
-        type=app.type,
-        status=app.status,
-        severity=app.severity,
-        latest_external_rating=app.latest_external_rating,
-        remark=app.remark,
-        created_at=app.created_at,
-        reviewed_at=app.reviewed_at,
-        customer_id=app.customer_id,
-        customer_name=customer.name if customer else "",
-        reason_id=app.reason_id,
-        reason_description=reason.description if reason else "",
-        created_by=app.created_by,
-        created_by_name=cb.full_name if cb else None,
-        reviewed_by=app.reviewed_by,
-        reviewed_by_name=rb.full_name if rb else None,
-    )
+    return _detail_from_row(row)
 
 
-@router.patch("/{app_id}", response_model=ApplicationOut, dependencies=[Depends(require_role(RoleEnum.admin))])
-def admin_update_application(app_id: int, payload: ApplicationUpdate, db: Session = Depends(get_db)):
+@router.patch("/{app_id}", response_model=ApplicationOut)
+def admin_update_application(app_id: int, payload: ApplicationUpdate, request: Request, db: Session = Depends(get_db), admin=Depends(require_role(RoleEnum.admin))):
     app = db.get(Application, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Not found")
@@ -187,28 +311,39 @@ def admin_update_application(app_id: int, payload: ApplicationUpdate, db: Sessio
             remark=data.get("remark", app.remark),
         )
         _validate_business_rules(db, temp)
+    # An approved application moves between rollup buckets if its type or customer changes
+    deltas = stats_rollup.application_delta(db, app, -1)
+    old_customer_id = app.customer_id
     for k, v in data.items():
         setattr(app, k, v)
     db.add(app)
-    write_audit(db, None, "ADMIN_UPDATE", "Application", str(app.id), None)
+    stats_rollup.apply_deltas(db, deltas + stats_rollup.application_delta(db, app, 1))
+    # ... and may open or close default periods of the old and new customer
+    if app.status == ApplicationStatus.approved.value and ("type" in data or "customer_id" in data):
+        db.flush()
+        default_periods.rebuild(db, {old_customer_id, app.customer_id})
+    write_audit(db, admin.id, "ADMIN_UPDATE", "Application", str(app.id), None, client_ip(request))
     db.commit()
     db.refresh(app)
     return app
 
 
-@router.delete("/{app_id}", dependencies=[Depends(require_role(RoleEnum.admin))])
-def admin_delete_application(app_id: int, db: Session = Depends(get_db)):
+@router.delete("/{app_id}")
+def admin_delete_application(app_id: int, request: Request, db: Session = Depends(get_db), admin=Depends(require_role(RoleEnum.admin))):
     app = db.get(Application, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Not found")
+    stats_rollup.apply_deltas(db, stats_rollup.application_delta(db, app, -1))
     db.delete(app)
-    write_audit(db, None, "ADMIN_DELETE", "Application", str(app_id), None)
+    if app.status == ApplicationStatus.approved.value:
+        db.flush()
+        default_periods.rebuild(db, {app.customer_id})
+    write_audit(db, admin.id, "ADMIN_DELETE", "Application", str(app_id), None, client_ip(request))
     db.commit()
     return {"ok": True}
 
 
-@router.post("/{app_id}/attachments")
-def upload_attachment(app_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), user=Depends(get_current_user)):
+def _check_upload_allowed(db: Session, app_id: int, user):
     app = db.get(Application, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
@@ -217,14 +352,30 @@ def upload_attachment(app_id: int, file: UploadFile = File(...), db: Session = D
         raise HTTPException(status_code=400, detail="Attachments not allowed after review")
     if user.role != RoleEnum.admin.value and app.created_by != user.id:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    content = file.file.read()
-    key = f"applications/{app_id}/{file.filename}"
-    storage = Storage()
-    url = storage.save(key, content, file.content_type)
-    att = ApplicationAttachment(application_id=app_id, filename=file.filename, url=url)
+
+
+def _record_attachment(db: Session, app_id: int, user, filename: str, stored: StoredObject, ip: Optional[str]):
+    att = ApplicationAttachment(
+        application_id=app_id, filename=filename, url=stored.url, size=stored.size, checksum=stored.checksum,
+    )
     db.add(att)
-    write_audit(db, user.id, "UPLOAD", "ApplicationAttachment", str(app_id), file.filename)
+    write_audit(db, user.id, "UPLOAD", "ApplicationAttachment", str(app_id), filename, ip)
     db.commit()
+
+
+@router.post("/{app_id}/attachments")
+async def upload_attachment(app_id: int, request: Request, file: UploadFile = File(...), db: Session = Depends(get_db), user=Depends(get_current_user)):
+    # Async so the copy to storage runs on the storage thread budget rather than
+    # holding a request threadpool slot; DB work still goes through the threadpool
+    await run_in_threadpool(_check_upload_allowed, db, app_id, user)
+    if file.size is not None and file.size > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    key = f"applications/{app_id}/{file.filename}"
+    try:
+        stored = await get_storage().asave_stream(key, file.file, file.content_type, max_bytes=settings.max_upload_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    await run_in_threadpool(_record_attachment, db, app_id, user, file.filename, stored, client_ip(request))
     return {"ok": True}
 
 
@@ -247,15 +398,146 @@ def get_presigned_attachment(app_id: int, filename: str, db: Session = Depends(g
     if getattr(user, "role", None) == RoleEnum.operator.value and app.created_by != user.id:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     key = f"applications/{app_id}/{filename}"
-    storage = Storage()
-    url = storage.get_presigned_url(key)
+    url = get_storage().get_presigned_url(key)
     if url:
         return {"url": url}
     return {"url": f"/files/{key}"}
 
 
+def _claimable_by(reviewer_id: int, now: datetime):
+    return or_(
+        Application.claimed_by.is_(None),
+        Application.claimed_by == reviewer_id,
+        Application.claim_expires_at < now,
+    )
+
+
+@router.post("/queue/claim", response_model=List[ApplicationOut], dependencies=[Depends(require_role(RoleEnum.reviewer, RoleEnum.admin))])
+def claim_review_queue(limit: int = 10, db: Session = Depends(get_db), reviewer=Depends(get_current_user)):
+    """Lease the oldest pending applications to the caller.
+
+    The caller's own live leases count as claimable, so polling again renews them.
+    One UPDATE claims the rows: Postgres skips rows other reviewers are claiming
+    (FOR UPDATE SKIP LOCKED), SQLite serializes writers and the repeated claim
+    condition keeps the lease atomic.
+    """
+    limit = max(1, min(limit, MAX_CLAIM_ITEMS))
+    now = datetime.utcnow()
+    claimable = (Application.status == ApplicationStatus.pending.value, _claimable_by(reviewer.id, now))
+    candidates = (
+        select(Application.id)
+        .where(*claimable)
+        .order_by(Application.created_at, Application.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = db.scalars(
+        update(Application)
+        .where(Application.id.in_(candidates), *claimable)
+        .values(claimed_by=reviewer.id, claim_expires_at=now + timedelta(seconds=settings.review_claim_ttl_seconds))
+        .returning(Application.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    if not ids:
+        return []
+    return db.query(Application).filter(Application.id.in_(ids)).order_by(Application.created_at, Application.id).all()
+
+
+@router.delete("/{app_id}/claim", dependencies=[Depends(require_role(RoleEnum.reviewer, RoleEnum.admin))])
+def release_claim(app_id: int, db: Session = Depends(get_db), reviewer=Depends(get_current_user)):
+    released = db.execute(
+        update(Application)
+        .where(Application.id == app_id, Application.claimed_by == reviewer.id)
+        .values(claimed_by=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return {"ok": bool(released)}
+
+
+def _apply_decision(db: Session, app_ids: List[int], decision: str, reviewer_id: int, ip: Optional[str] = None):
+    """Review pending applications with set-based statements; returns the rows that transitioned.
+
+    Rows are locked in id order with SKIP LOCKED (Postgres) so concurrent reviewers
+    never wait on each other, and the UPDATE itself only matches PENDING rows, so a
+    decision is never applied twice. Rows leased to another reviewer are left alone.
+    Caller commits.
+    """
+    now = datetime.utcnow()
+    reviewable = (Application.status == ApplicationStatus.pending.value, _claimable_by(reviewer_id, now))
+    lockable = db.scalars(
+        select(Application.id)
+        .where(Application.id.in_(app_ids), *reviewable)
+        .order_by(Application.id)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not lockable:
+        return []
+    rows = db.execute(
+        update(Application)
+        .where(Application.id.in_(lockable), *reviewable)
+        .values(status=decision, reviewed_by=reviewer_id, reviewed_at=now, claimed_by=None, claim_expires_at=None)
+        .returning(
+            Application.id, Application.type, Application.customer_id, Application.created_by,
+            Application.severity, Application.reason_id, Application.reviewed_at,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    rows.sort(key=lambda r: r.id)
+
+    if decision == ApplicationStatus.approved.value:
+        # Later approvals for the same customer win, as if reviewed one by one in id order
+        deciding = {}
+        for r in rows:
+            if r.type in (ApplicationType.default.value, ApplicationType.rebirth.value):
+                deciding[r.customer_id] = r
+        flags = {cid: r.type == ApplicationType.default.value for cid, r in deciding.items()}
+        if flags:
+            db.execute(select(Customer.id).where(Customer.id.in_(flags)).order_by(Customer.id).with_for_update()).all()
+        for flag in (True, False):
+            ids = [cid for cid, f in flags.items() if f is flag]
+            if ids:
+                db.execute(
+                    update(Customer).where(Customer.id.in_(ids)).values(is_default=flag)
+                    .execution_options(synchronize_session=False)
+                )
+        default_periods.record(db, deciding.values())
+        stats_rollup.record_approvals(db, rows)
+
+    # Notify applicants and audit in two executemany inserts
+    notes = [
+        {"user_id": r.created_by, "content": f"Application #{r.id} {decision}"}
+        for r in rows if r.created_by
+    ]
+    if notes:
+        db.execute(insert(Notification), notes)
+    if rows:
+        db.execute(insert(AuditLog), [
+            audit_values(reviewer_id, "REVIEW", "Application", str(r.id), decision, ip) for r in rows
+        ])
+    return rows
+
+
+@router.post("/review/batch", response_model=BatchReviewResult, dependencies=[Depends(require_role(RoleEnum.reviewer, RoleEnum.admin))])
+def batch_review_applications(payload: BatchReviewAction, request: Request, db: Session = Depends(get_db), reviewer=Depends(get_current_user)):
+    if payload.decision not in (ApplicationStatus.approved.value, ApplicationStatus.rejected.value):
+        raise HTTPException(status_code=400, detail="Invalid decision")
+    ids = list(dict.fromkeys(payload.ids))
+    if len(ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    rows = _apply_decision(db, ids, payload.decision, reviewer.id, client_ip(request)) if ids else []
+    db.commit()
+    reviewed = {r.id for r in rows}
+    # Skipped: missing, no longer pending, or being reviewed concurrently
+    return BatchReviewResult(
+        reviewed=[i for i in ids if i in reviewed],
+        skipped=[i for i in ids if i not in reviewed],
+    )
+
+
 @router.post("/{app_id}/review", response_model=ApplicationOut, dependencies=[Depends(require_role(RoleEnum.reviewer, RoleEnum.admin))])
-def review_application(app_id: int, payload: ReviewAction, db: Session = Depends(get_db), reviewer=Depends(get_current_user)):
+def review_application(app_id: int, payload: ReviewAction, request: Request, db: Session = Depends(get_db), reviewer=Depends(get_current_user)):
     app = db.get(Application, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Not found")
@@ -264,28 +546,16 @@ def review_application(app_id: int, payload: ReviewAction, db: Session = Depends
 
     if payload.decision not in (ApplicationStatus.approved.value, ApplicationStatus.rejected.value):
         raise HTTPException(status_code=400, detail="Invalid decision")
+    if app.claimed_by not in (None, reviewer.id) and app.claim_expires_at and app.claim_expires_at > datetime.utcnow():
+        raise HTTPException(status_code=409, detail="Claimed by another reviewer")
 
     # Attachments optional: reviewers can approve without attachments
 
     # Transition and side effects in one transaction
-    app.status = payload.decision
-    app.reviewed_by = reviewer.id
-    app.reviewed_at = datetime.utcnow()
-    db.add(app)
-
-    customer = db.get(Customer, app.customer_id)
-    if payload.decision == ApplicationStatus.approved.value:
-        if app.type == ApplicationType.default.value:
-            customer.is_default = True
-        elif app.type == ApplicationType.rebirth.value:
-            customer.is_default = False
-        db.add(customer)
-
-    # Notify applicant
-    n = Notification(user_id=app.created_by, content=f"Application #{app.id} {payload.decision}")
-    db.add(n)
-
-    write_audit(db, reviewer.id, "REVIEW", "Application", str(app.id), payload.decision)
+    if not _apply_decision(db, [app_id], payload.decision, reviewer.id, client_ip(request)):
+        # lost the race to a concurrent reviewer
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Not pending")
     db.commit()
     db.refresh(app)
     return app
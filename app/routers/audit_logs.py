@@ -2,15 +2,40 @@ from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 from app.db.database import get_db
+from app.audit import action_codes, audit_row_out, audit_writer, decoded_audit_select, target_codes
+from app.audit_partitions import audit_source
 from app.deps import require_role
-from app.models import AuditLog, RoleEnum, User
+from app.export import export_response
+from app.models import RoleEnum
+from app.pagination import clamp_limit, estimate_count, keyset_before, next_cursor
 
 
 router = APIRouter(prefix="/audit-logs", tags=["audit"])  # Admin-only
 
 
+EXPORT_COLUMNS = ["id", "timestamp", "user_id", "actor", "action", "resource", "details", "ip"]
+
+
+def _audit_filters(db: Session, user_id, action, target_type, start, end):
+    # Only the monthly partitions overlapping start/end are read
+    src = audit_source(db, start, end)
+    cond = []
+    if user_id is not None:
+        cond.append(src.c.user_id == user_id)
+    if action:
+        # name (REVIEW) or label (审核); compared as small-integer codes
+        cond.append(src.c.action_code.in_(action_codes(action)))
+    if target_type:
+        cond.append(src.c.target_code.in_(target_codes(target_type)))
+    if start:
+        cond.append(src.c.created_at >= start)
+    if end:
+        cond.append(src.c.created_at <= end)
+    return src, cond
+
+
 @router.get("/")
 def list_audit_logs(
     db: Session = Depends(get_db),
@@ -20,36 +45,52 @@ def list_audit_logs(
     target_type: Optional[str] = None,
     start: Optional[datetime] = None,
     end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    with_total: bool = False,
 ):
-    cond = []
-    if user_id is not None:
-        cond.append(AuditLog.user_id == user_id)
-    if action:
-        cond.append(AuditLog.action == action)
-    if target_type:
-        cond.append(AuditLog.target_type == target_type)
-    if start:
-        cond.append(AuditLog.created_at >= start)
-    if end:
-        cond.append(AuditLog.created_at <= end)
-    q = db.query(AuditLog)
+    src, cond = _audit_filters(db, user_id, action, target_type, start, end)
+    # Labels and actor names come from the same query instead of one lookup per row
+    q = decoded_audit_select(src)
     if cond:
-        q = q.filter(and_(*cond))
-    logs = q.order_by(AuditLog.created_at.desc()).limit(limit).all()
-    # Enrich with actor name and friendly fields expected by frontend
-    out = []
-    for l in logs:
-        actor = None
-        if l.user_id:
-            u = db.get(User, l.user_id)
-            actor = u.full_name or u.email if u else None
-        out.append({
-            "id": l.id,
-            "timestamp": l.created_at.isoformat() if l.created_at else None,
-            "actor": actor,
-            "action": l.action,
-            "resource": f"{l.target_type}:{l.target_id}" if l.target_type else l.target_id,
-            "ip": getattr(l, 'ip', None),
-        })
-    return {"items": out}
+        q = q.where(and_(*cond))
+    limit = clamp_limit(limit)
+    after = keyset_before(src.c.created_at, src.c.id, cursor)
+    page = q.where(after) if after is not None else q
+    logs = db.execute(page.order_by(src.c.created_at.desc(), src.c.id.desc()).limit(limit + 1)).all()
+    out = [audit_row_out(l) for l in logs[:limit]]
+    result = {"items": out, "next_cursor": next_cursor(logs, limit)}
+    if with_total:
+        # Estimated over all pages; exact only when total_exact is true
+        result["total_estimate"], result["total_exact"] = estimate_count(db, select(src.c.id).where(*cond))
+    return result
+
+
+@router.get("/metrics")
+def audit_writer_metrics(_=Depends(require_role(RoleEnum.admin))):
+    return audit_writer.metrics()
+
+
+@router.get("/export")
+def export_audit_logs(
+    db: Session = Depends(get_db),
+    _=Depends(require_role(RoleEnum.admin)),
+    format: str = "ndjson",
+    gzip: bool = True,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    target_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    # Same filters as the list, oldest first, streamed through a server-side cursor without a cap
+    src, cond = _audit_filters(db, user_id, action, target_type, start, end)
+    stmt = decoded_audit_select(src).where(*cond).order_by(src.c.created_at, src.c.id)
+    return export_response(
+        stmt,
+        EXPORT_COLUMNS,
+        lambda row: {**audit_row_out(row), "user_id": row.user_id, "details": row.details},
+        format,
+        gzip,
+        "audit_logs",
+    )
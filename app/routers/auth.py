@@ -1,54 +1,59 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models import User, RoleEnum
-from app.security import verify_password, get_password_hash, create_access_token
+from app.security import averify_and_update_password, adummy_verify, get_password_hash, create_access_token
 from app.schemas import Token
 from app.core.config import settings
-from app.audit import write_audit
+from app.audit import client_ip, write_audit
 from fastapi import Request
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 def ensure_seed_users(db: Session):
-    # Admin
-    if not db.query(User).filter(User.email == settings.admin_default_email).first():
-        db.add(User(
-            email=settings.admin_default_email,
-            full_name="Admin",
-            hashed_password=get_password_hash(settings.admin_default_password),
-            role=RoleEnum.admin.value,
-        ))
-    # Reviewer
-    if not db.query(User).filter(User.email == settings.reviewer_default_email).first():
-        db.add(User(
-            email=settings.reviewer_default_email,
-            full_name="Reviewer",
-            hashed_password=get_password_hash(settings.reviewer_default_password),
-            role=RoleEnum.reviewer.value,
-        ))
-    # Operator
-    if not db.query(User).filter(User.email == settings.operator_default_email).first():
-        db.add(User(
-            email=settings.operator_default_email,
-            full_name="Operator",
-            hashed_password=get_password_hash(settings.operator_default_password),
-            role=RoleEnum.operator.value,
-        ))
+    """Create the default admin/reviewer/operator accounts if missing; run once at startup."""
+    seeds = [
+        (settings.admin_default_email, "Admin", settings.admin_default_password, RoleEnum.admin.value),
+        (settings.reviewer_default_email, "Reviewer", settings.reviewer_default_password, RoleEnum.reviewer.value),
+        (settings.operator_default_email, "Operator", settings.operator_default_password, RoleEnum.operator.value),
+    ]
+    existing = {e for (e,) in db.query(User.email).filter(User.email.in_([s[0] for s in seeds]))}
+    for email, full_name, password, role in seeds:
+        if email not in existing:
+            db.add(User(email=email, full_name=full_name, hashed_password=get_password_hash(password), role=role))
+    db.commit()
+
+
+def _find_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _record_login(db: Session, user: User, new_hash: Optional[str], ip: Optional[str]):
+    if new_hash:
+        # bcrypt cost changed since this password was hashed
+        user.hashed_password = new_hash
+    write_audit(db, user.id, "LOGIN", "User", str(user.id), None, ip)
     db.commit()
 
 
 @router.post("/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db), request: Request = None):
-    ensure_seed_users(db)
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db), request: Request = None):
+    # Async so bcrypt waits on its own bounded pool, not on a request threadpool slot
+    user = await run_in_threadpool(_find_user, db, form_data.username)
+    if user:
+        ok, new_hash = await averify_and_update_password(form_data.password, user.hashed_password)
+    else:
+        # same cost as a real check, so response time does not reveal unknown emails
+        await adummy_verify()
+        ok, new_hash = False, None
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     token = create_access_token(user.email)
     # Audit login
-    ip = request.client.host if request and request.client else None
-    write_audit(db, user.id, "LOGIN", "User", str(user.id), None, ip)
-    db.commit()
+    ip = client_ip(request) if request else None
+    await run_in_threadpool(_record_login, db, user, new_hash, ip)
     return Token(access_token=token)
@@ -3,8 +3,11 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.db.database import get_db
 from app.deps import require_role, get_current_user
-from app.models import Customer, RoleEnum
-from app.schemas import CustomerCreate, CustomerUpdate, CustomerOut
+from app.models import Customer, CustomerDefaultPeriod, RoleEnum
+from app.schemas import CustomerCreate, CustomerUpdate, CustomerOut, CustomerDefaultPeriodOut
+from app.search import index_customer_name, unindex_customer, matching_customer_ids
+from app.pagination import DEFAULT_PAGE_SIZE, clamp_limit
+from app import stats_rollup
 
 
 router = APIRouter(prefix="/customers", tags=["customers"])
@@ -24,6 +27,8 @@ def create_customer(payload: CustomerCreate, db: Session = Depends(get_db)):
         return exists
     c = Customer(name=payload.name, industry=payload.industry, region=payload.region)
     db.add(c)
+    db.flush()
+    index_customer_name(db, c.id, c.name)
     db.commit()
     db.refresh(c)
     return c
@@ -34,6 +39,19 @@ def list_customers(db: Session = Depends(get_db), user=Depends(get_current_user)
     return db.query(Customer).all()
 
 
+@router.get("/search", response_model=List[CustomerOut])
+def search_customers(q: str, limit: int = DEFAULT_PAGE_SIZE, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    if not q.strip():
+        return []
+    return (
+        db.query(Customer)
+        .filter(Customer.id.in_(matching_customer_ids(q)))
+        .order_by(Customer.name)
+        .limit(clamp_limit(limit))
+        .all()
+    )
+
+
 @router.get("/{customer_id}", response_model=CustomerOut)
 def get_customer(customer_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
     c = db.get(Customer, customer_id)
@@ -42,6 +60,18 @@ def get_customer(customer_id: int, db: Session = Depends(get_db), user=Depends(g
     return c
 
 
+@router.get("/{customer_id}/default-periods", response_model=List[CustomerDefaultPeriodOut])
+def customer_default_periods(customer_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    if not db.get(Customer, customer_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return (
+        db.query(CustomerDefaultPeriod)
+        .filter(CustomerDefaultPeriod.customer_id == customer_id)
+        .order_by(CustomerDefaultPeriod.started_at)
+        .all()
+    )
+
+
 @router.patch("/{customer_id}", response_model=CustomerOut, dependencies=[Depends(require_role(RoleEnum.admin, RoleEnum.operator))])
 def update_customer(customer_id: int, payload: CustomerUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     c = db.get(Customer, customer_id)
@@ -56,9 +86,13 @@ def update_customer(customer_id: int, payload: CustomerUpdate, db: Session = Dep
         exists = db.query(Customer).filter(Customer.name == data["name"], Customer.id != customer_id).first()
         if exists:
             raise HTTPException(status_code=400, detail="Customer name already exists")
+    old_group = (c.industry, c.region)
     for k, v in data.items():
         setattr(c, k, v)
     db.add(c)
+    stats_rollup.move_customer(db, c.id, old_group, (c.industry, c.region))
+    if "name" in data:
+        index_customer_name(db, c.id, c.name)
     db.commit()
     db.refresh(c)
     return c
@@ -69,6 +103,7 @@ def delete_customer(customer_id: int, db: Session = Depends(get_db)):
     c = db.get(Customer, customer_id)
     if not c:
         raise HTTPException(status_code=404, detail="Not found")
+    unindex_customer(db, c.id)
     db.delete(c)
     db.commit()
     return {"ok": True}
@@ -1,124 +1,335 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, case, text
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, literal, select, tuple_
 from sqlalchemy.orm import Session
-from typing import List, Dict, Tuple
+from typing import Callable, Hashable, List, Dict, Optional
+from app import default_periods
+from app.cache import VersionedCache
+from app.core.config import settings
 from app.db.database import get_db
 from app.deps import get_current_user
-from app.models import Application, ApplicationType, Customer
+from app.models import ApplicationType, Reason, StatsDaily, StatsMonthly
+from app.stats_rollup import STATS_CACHE
 
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+# (endpoint, params...) -> (etag, serialized body)
+stats_cache = VersionedCache(
+    STATS_CACHE,
+    maxsize=settings.stats_cache_size,
+    ttl=settings.stats_cache_ttl_seconds,
+    check_interval=settings.cache_version_check_seconds,
+)
 
-def _monthly_trends(db: Session, group_col, year: int) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
-    start = datetime(year, 1, 1)
-    end = datetime(year + 1, 1, 1)
-    # DB-agnostic month extraction
-    dialect = db.bind.dialect.name if db.bind is not None else "sqlite"
-    if dialect == "sqlite":
-        month_expr = func.strftime("%m", Application.reviewed_at)
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _cached_json(request: Request, db: Session, key: Hashable, compute: Callable) -> Response:
+    """Serve ``compute()`` as JSON from the stats cache, answering 304 to a matching If-None-Match."""
+    stats_cache.sync(db)
+    entry = stats_cache.get(key)
+    if entry is None:
+        body = json.dumps(jsonable_encoder(compute()), ensure_ascii=False, separators=(",", ":")).encode()
+        entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        stats_cache.set(key, entry)
+    etag, body = entry
+    # Browsers keep the body and revalidate each time; the version bump changes the tag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# '' (missing industry/region/severity) is reported as "N/A", reason 0 as null
+DIMENSIONS = ("industry", "region", "month", "type", "severity", "reason")
+RANGE_DIMENSIONS = tuple(d for d in DIMENSIONS if d != "month")
+MEASURES = ("count", "share", "trend")
+GRANULARITIES = ("day", "week", "month", "quarter")
+MAX_RANGE_BUCKETS = 1000
+
+
+def _column(model, dim: str):
+    # Rollup column behind a dimension
+    return model.reason_id if dim == "reason" else getattr(model, dim)
+
+
+def _split(value: str, allowed, what: str) -> List[str]:
+    items = [x.strip() for x in value.split(",") if x.strip()]
+    unknown = [x for x in items if x not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {what}: {', '.join(unknown)}")
+    # de-duplicated, in request order
+    return list(dict.fromkeys(items))
+
+
+def _dim_value(dim: str, v):
+    if dim == "reason":
+        return v or None
+    if dim == "month":
+        return v
+    return v or "N/A"
+
+
+def stats_cube(db: Session, year: int, dims: List[str], measures=MEASURES, filters: Optional[Dict] = None) -> Dict:
+    """Counts of approved applications grouped by ``dims`` in one scan of the rollup.
+
+    Every cell carries its count, its share of the filtered total and, unless
+    ``month`` is itself a dimension, its 12-month trend. On PostgreSQL the cell
+    totals and the monthly breakdown come out of one GROUPING SETS query; other
+    dialects group by month and the cells are folded here. The grand total is a
+    window over the same aggregate in both cases.
+    """
+    group = [_column(StatsMonthly, d) for d in dims]
+    if "reason" in dims:
+        group.append(Reason.description)
+    n = func.sum(StatsMonthly.count)
+    by_month = "trend" in measures and "month" not in dims
+    month = StatsMonthly.month
+    if not by_month:
+        stmt = select(*group, n.label("n"), literal(0).label("rolled"), func.sum(n).over().label("total"))
+        stmt = stmt.group_by(*group)
+    elif group and db.get_bind().dialect.name == "postgresql":
+        rolled = func.grouping(month)
+        stmt = select(*group, month, n.label("n"), rolled.label("rolled"), func.sum(n).over(partition_by=rolled).label("total"))
+        stmt = stmt.group_by(func.grouping_sets(tuple_(*group, month), tuple_(*group)))
     else:
-        # assumes postgres
-        month_expr = func.to_char(Application.reviewed_at, text("'MM'"))
-    rows = (
-        db.query(
-            group_col.label("g"),
-            month_expr.label("m"),
-            func.sum(case((Application.type == ApplicationType.default.value, 1), else_=0)).label("cnt_d"),
-            func.sum(case((Application.type == ApplicationType.rebirth.value, 1), else_=0)).label("cnt_r"),
-        )
-        .join(Customer, Application.customer_id == Customer.id)
-        .filter(Application.reviewed_at >= start, Application.reviewed_at < end, Application.status == "APPROVED")
-        .group_by("g", "m")
-        .all()
-    )
-    d: Dict[str, List[int]] = {}
-    r: Dict[str, List[int]] = {}
-    for g, m, cnt_d, cnt_r in rows:
-        gk = g or "N/A"
-        if gk not in d:
-            d[gk] = [0] * 12
-            r[gk] = [0] * 12
-        mi = int(m) - 1 if m and m.isdigit() else 0
-        d[gk][mi] += int(cnt_d or 0)
-        r[gk][mi] += int(cnt_r or 0)
-    return d, r
+        stmt = select(*group, month, n.label("n"), literal(0).label("rolled"), func.sum(n).over().label("total"))
+        stmt = stmt.group_by(*group, month)
+    if "reason" in dims:
+        stmt = stmt.outerjoin(Reason, Reason.id == StatsMonthly.reason_id)
+    stmt = stmt.where(StatsMonthly.year == year, *(_column(StatsMonthly, k) == v for k, v in (filters or {}).items()))
 
+    total = 0
+    cells: Dict[tuple, Dict] = {}
+    for row in db.execute(stmt):
+        total = int(row.total or 0)
+        key = tuple(row[:len(group)])
+        cell = cells.setdefault(key, {"count": None, "trend": [0] * 12})
+        if not by_month or row.rolled:
+            cell["count"] = int(row.n or 0)
+        else:
+            cell["trend"][row.month - 1] += int(row.n or 0)
 
-@router.get("/industry")
-def by_industry(year: int, detailed: bool = False, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    start = datetime(year, 1, 1)
-    end = datetime(year + 1, 1, 1)
-    q = (
-        db.query(
-            Customer.industry,
-            func.sum(case((Application.type == ApplicationType.default.value, 1), else_=0)).label("defaults"),
-            func.sum(case((Application.type == ApplicationType.rebirth.value, 1), else_=0)).label("rebirths"),
-        )
-        .join(Application, Application.customer_id == Customer.id)
-        .filter(Application.reviewed_at >= start, Application.reviewed_at < end, Application.status == "APPROVED")
-        .group_by(Customer.industry)
+    out = []
+    for key in sorted(cells, key=lambda k: tuple("" if v is None else v for v in k)):
+        cell = cells[key]
+        count = sum(cell["trend"]) if cell["count"] is None else cell["count"]
+        # counts that went back to zero after edits/deletes stay in the rollup
+        if not count:
+            continue
+        item = {d: _dim_value(d, v) for d, v in zip(dims, key)}
+        if "reason" in dims:
+            item["reason_description"] = key[-1]
+        if "count" in measures:
+            item["count"] = count
+        if "share" in measures:
+            item["share"] = (count / total) if total else 0.0
+        if by_month:
+            item["trend"] = cell["trend"]
+        out.append(item)
+    return {"year": year, "dims": dims, "measures": list(measures), "total": total, "cells": out}
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return day
+
+
+def _next_bucket(start: date, granularity: str) -> date:
+    if granularity in ("month", "quarter"):
+        y, m = divmod(start.year * 12 + start.month - 1 + (3 if granularity == "quarter" else 1), 12)
+        return date(y, m + 1, 1)
+    return start + timedelta(days=7 if granularity == "week" else 1)
+
+
+def stats_range(db: Session, start: date, end: date, granularity: str, dims: List[str], filters: Optional[Dict] = None) -> Dict:
+    """Approved-application counts per ``granularity`` bucket between ``start`` and ``end`` (inclusive).
+
+    Reads the daily rollup grouped by day and ``dims``, then sums the days into
+    buckets, so the cost follows days x groups rather than applications. Edge
+    buckets only count the days inside the range.
+    """
+    periods = []
+    p = _bucket_start(start, granularity)
+    while p <= end:
+        periods.append(p)
+        if len(periods) > MAX_RANGE_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_RANGE_BUCKETS} {granularity} buckets")
+        p = _next_bucket(p, granularity)
+    index = {p: i for i, p in enumerate(periods)}
+
+    group = [_column(StatsDaily, d) for d in dims]
+    if "reason" in dims:
+        group.append(Reason.description)
+    stmt = (
+        select(StatsDaily.day, *group, func.sum(StatsDaily.count).label("n"))
+        .where(StatsDaily.day >= start, StatsDaily.day <= end, *(_column(StatsDaily, k) == v for k, v in (filters or {}).items()))
+        .group_by(StatsDaily.day, *group)
     )
-    rows = q.all()
+    if "reason" in dims:
+        stmt = stmt.outerjoin(Reason, Reason.id == StatsDaily.reason_id)
+
+    series: Dict[tuple, List[int]] = {}
+    for row in db.execute(stmt):
+        counts = series.setdefault(tuple(row[1:len(group) + 1]), [0] * len(periods))
+        counts[index[_bucket_start(row.day, granularity)]] += int(row.n or 0)
+
+    out = []
+    for key in sorted(series, key=lambda k: tuple("" if v is None else v for v in k)):
+        counts = series[key]
+        if not any(counts):
+            continue
+        item = {d: _dim_value(d, v) for d, v in zip(dims, key)}
+        if "reason" in dims:
+            item["reason_description"] = key[-1]
+        out.append({**item, "total": sum(counts), "counts": counts})
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "dims": dims,
+        "periods": periods,
+        "total": sum(x["total"] for x in out),
+        "series": out,
+    }
+
+
+def _filters(type_, industry, region, severity, reason_id) -> Dict:
+    filters = {
+        k: ("" if v == "N/A" else v)
+        for k, v in (("type", type_), ("industry", industry), ("region", region), ("severity", severity)) if v is not None
+    }
+    if reason_id is not None:
+        filters["reason"] = reason_id
+    return filters
+
+
+def _grouped_stats(db: Session, dim: str, year: int, detailed: bool) -> List[Dict]:
+    # Per-group type counts and trends are one cube over (dim, type)
+    cube = stats_cube(db, year, [dim, "type"], ("count", "trend"))
+    d: Dict[str, List[int]] = {}
+    r: Dict[str, List[int]] = {}
+    for cell in cube["cells"]:
+        g = cell[dim]
+        d.setdefault(g, [0] * 12)
+        r.setdefault(g, [0] * 12)
+        if cell["type"] == ApplicationType.default.value:
+            d[g] = cell["trend"]
+        elif cell["type"] == ApplicationType.rebirth.value:
+            r[g] = cell["trend"]
     base = [
-        {"industry": ind or "N/A", "default_count": int(defs or 0), "rebirth_count": int(rebs or 0)}
-        for ind, defs, rebs in rows
+        {dim: g, "default_count": sum(d[g]), "rebirth_count": sum(r[g])}
+        for g in sorted(d) if sum(d[g]) or sum(r[g])
     ]
     if not detailed:
         return base
-    total_defaults = sum(x[1] or 0 for x in rows)
-    total_rebirths = sum(x[2] or 0 for x in rows)
-    d_trend, r_trend = _monthly_trends(db, Customer.industry, year)
+    total_defaults = sum(x["default_count"] for x in base)
+    total_rebirths = sum(x["rebirth_count"] for x in base)
     enhanced = []
     for item in base:
-        ind = item["industry"]
+        g = item[dim]
         dc = item["default_count"]
         rc = item["rebirth_count"]
         enhanced.append({
             **item,
             "default_share": (dc / total_defaults) if total_defaults else 0.0,
             "rebirth_share": (rc / total_rebirths) if total_rebirths else 0.0,
-            "default_trend": d_trend.get(ind, [0]*12),
-            "rebirth_trend": r_trend.get(ind, [0]*12),
+            "default_trend": d[g],
+            "rebirth_trend": r[g],
         })
     return enhanced
 
 
+@router.get("/cube")
+def cube(
+    request: Request,
+    year: int,
+    dims: str = "industry",
+    measures: str = ",".join(MEASURES),
+    type: Optional[str] = None,
+    industry: Optional[str] = None,
+    region: Optional[str] = None,
+    severity: Optional[str] = None,
+    reason_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    dim_list = _split(dims, DIMENSIONS, "dimension")
+    measure_list = _split(measures, MEASURES, "measure")
+    filters = _filters(type, industry, region, severity, reason_id)
+    key = ("cube", year, tuple(dim_list), tuple(measure_list), tuple(sorted(filters.items())))
+    return _cached_json(request, db, key, lambda: stats_cube(db, year, dim_list, measure_list, filters))
+
+
+@router.get("/range")
+def time_range(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "day",
+    dims: str = "",
+    type: Optional[str] = None,
+    industry: Optional[str] = None,
+    region: Optional[str] = None,
+    severity: Optional[str] = None,
+    reason_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    # Defaults to the last 90 days
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=89)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    dim_list = _split(dims, RANGE_DIMENSIONS, "dimension")
+    filters = _filters(type, industry, region, severity, reason_id)
+    key = ("range", start, end, granularity, tuple(dim_list), tuple(sorted(filters.items())))
+    return _cached_json(request, db, key, lambda: stats_range(db, start, end, granularity, dim_list, filters))
+
+
+def _default_group(by: Optional[str]) -> Optional[str]:
+    if by is not None and by not in default_periods.GROUPS:
+        raise HTTPException(status_code=400, detail="by must be industry or region")
+    return by
+
+
+@router.get("/defaults/snapshot")
+def defaults_snapshot(at: Optional[datetime] = None, by: Optional[str] = None, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return default_periods.snapshot(db, at or datetime.utcnow(), _default_group(by))
+
+
+@router.get("/defaults/overlap")
+def defaults_overlap(start: datetime, end: datetime, by: Optional[str] = None, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return default_periods.overlapping(db, start, end, _default_group(by))
+
+
+@router.get("/industry")
+def by_industry(request: Request, year: int, detailed: bool = False, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return _cached_json(request, db, ("industry", year, detailed),
+                        lambda: _grouped_stats(db, "industry", year, detailed))
+
+
 @router.get("/region")
-def by_region(year: int, detailed: bool = False, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    start = datetime(year, 1, 1)
-    end = datetime(year + 1, 1, 1)
-    q = (
-        db.query(
-            Customer.region,
-            func.sum(case((Application.type == ApplicationType.default.value, 1), else_=0)).label("defaults"),
-            func.sum(case((Application.type == ApplicationType.rebirth.value, 1), else_=0)).label("rebirths"),
-        )
-        .join(Application, Application.customer_id == Customer.id)
-        .filter(Application.reviewed_at >= start, Application.reviewed_at < end, Application.status == "APPROVED")
-        .group_by(Customer.region)
-    )
-    rows = q.all()
-    base = [
-        {"region": reg or "N/A", "default_count": int(defs or 0), "rebirth_count": int(rebs or 0)}
-        for reg, defs, rebs in rows
-    ]
-    if not detailed:
-        return base
-    total_defaults = sum(x[1] or 0 for x in rows)
-    total_rebirths = sum(x[2] or 0 for x in rows)
-    d_trend, r_trend = _monthly_trends(db, Customer.region, year)
-    enhanced = []
-    for item in base:
-        reg = item["region"]
-        dc = item["default_count"]
-        rc = item["rebirth_count"]
-        enhanced.append({
-            **item,
-            "default_share": (dc / total_defaults) if total_defaults else 0.0,
-            "rebirth_share": (rc / total_rebirths) if total_rebirths else 0.0,
-            "default_trend": d_trend.get(reg, [0]*12),
-            "rebirth_trend": r_trend.get(reg, [0]*12),
-        })
-    return enhanced
+def by_region(request: Request, year: int, detailed: bool = False, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return _cached_json(request, db, ("region", year, detailed),
+                        lambda: _grouped_stats(db, "region", year, detailed))
@@ -1,38 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.database import get_db
-from app.deps import require_role, get_current_user
+from app.deps import require_role, get_current_user, invalidate_principal
 from app.models import User, RoleEnum
 from app.schemas import UserCreate, UserUpdate, UserOut
-from app.security import get_password_hash
+from app.security import aget_password_hash
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.post("/", response_model=UserOut, dependencies=[Depends(require_role(RoleEnum.admin))])
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
+def _save_new_user(db: Session, payload: UserCreate, hashed_password: str) -> User:
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
         # idempotent: update password/role/full_name if provided
         if payload.full_name:
             existing.full_name = payload.full_name
         if payload.password:
-            existing.hashed_password = get_password_hash(payload.password)
+            existing.hashed_password = hashed_password
         if payload.role:
             existing.role = payload.role
+        invalidate_principal(db, existing.email)
         db.commit()
         db.refresh(existing)
         return existing
     new_user = User(email=payload.email, full_name=payload.full_name, role=(payload.role or RoleEnum.operator.value))
-    new_user.hashed_password = get_password_hash(payload.password)
+    new_user.hashed_password = hashed_password
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     return new_user
 
 
+@router.post("/", response_model=UserOut, dependencies=[Depends(require_role(RoleEnum.admin))])
+async def create_user(payload: UserCreate, db: Session = Depends(get_db)):
+    # Async so bcrypt waits on its own bounded pool, not on a request threadpool slot
+    hashed_password = await aget_password_hash(payload.password)
+    return await run_in_threadpool(_save_new_user, db, payload, hashed_password)
+
+
 @router.get("/", response_model=List[UserOut], dependencies=[Depends(require_role(RoleEnum.admin))])
 def list_users(db: Session = Depends(get_db)):
     return db.query(User).all()
@@ -51,31 +59,35 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
     return u
 
 
-@router.patch("/{user_id}", response_model=UserOut, dependencies=[Depends(require_role(RoleEnum.admin))])
-def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_db)):
+def _save_user_update(db: Session, user_id: int, payload: UserUpdate, hashed_password: Optional[str]) -> User:
     u = db.get(User, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="Not found")
     if payload.full_name is not None:
         u.full_name = payload.full_name
-    if payload.password:
-        u.hashed_password = get_password_hash(payload.password)
+    if hashed_password:
+        u.hashed_password = hashed_password
     if payload.role:
         u.role = payload.role
     db.add(u)
+    invalidate_principal(db, u.email)
     db.commit()
     db.refresh(u)
     return u
 
 
+@router.patch("/{user_id}", response_model=UserOut, dependencies=[Depends(require_role(RoleEnum.admin))])
+async def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_db)):
+    hashed_password = await aget_password_hash(payload.password) if payload.password else None
+    return await run_in_threadpool(_save_user_update, db, user_id, payload, hashed_password)
+
+
 @router.delete("/{user_id}", dependencies=[Depends(require_role(RoleEnum.admin))])
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     u = db.get(User, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="Not found")
     db.delete(u)
+    invalidate_principal(db, u.email)
     db.commit()
     return {"ok": True}
-
-
- 
@@ -56,6 +56,18 @@ class CustomerOut(BaseModel):
         from_attributes = True
 
 
+class CustomerDefaultPeriodOut(BaseModel):
+    id: int
+    customer_id: int
+    started_at: datetime
+    ended_at: Optional[datetime]
+    start_application_id: Optional[int]
+    end_application_id: Optional[int]
+
+    class Config:
+        from_attributes = True
+
+
 class ReasonCreate(BaseModel):
     type: str
     description: str
@@ -83,6 +95,25 @@ class ApplicationCreate(BaseModel):
     remark: Optional[str] = None
 
 
+class ApplicationBulkCreate(BaseModel):
+    items: List[ApplicationCreate]
+
+
+class BulkCreated(BaseModel):
+    index: int
+    id: int
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class ApplicationBulkResult(BaseModel):
+    created: List[BulkCreated]
+    errors: List[BulkItemError]
+
+
 class ApplicationOut(BaseModel):
     id: int
     type: str
@@ -96,6 +127,8 @@ class ApplicationOut(BaseModel):
     reviewed_by: Optional[int]
     created_at: datetime
     reviewed_at: Optional[datetime]
+    claimed_by: Optional[int] = None
+    claim_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -106,6 +139,17 @@ class ReviewAction(BaseModel):
     remark: Optional[str] = None
 
 
+class BatchReviewAction(BaseModel):
+    ids: List[int]
+    decision: str  # APPROVED or REJECTED
+    remark: Optional[str] = None
+
+
+class BatchReviewResult(BaseModel):
+    reviewed: List[int]
+    skipped: List[int]
+
+
 class ApplicationUpdate(BaseModel):
     type: Optional[str] = None
     customer_id: Optional[int] = None
@@ -129,6 +173,8 @@ class ApplicationAttachmentOut(BaseModel):
     id: int
     filename: str
     url: str
+    size: Optional[int] = None
+    checksum: Optional[str] = None
     uploaded_at: datetime
 
     class Config:
@@ -153,3 +199,12 @@ class ApplicationDetailOut(BaseModel):
     reviewed_by: Optional[int]
     reviewed_by_name: Optional[str]
 
+
+class ApplicationPage(BaseModel):
+    items: List[ApplicationOut]
+    next_cursor: Optional[str] = None
+
+
+class ApplicationDetailPage(BaseModel):
+    items: List[ApplicationDetailOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,50 @@
+from typing import Set
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.models import Customer, CustomerNameGram
+
+
+def name_grams(name: str) -> Set[str]:
+    # Unigrams and bigrams cover any substring query: a term of length >= 2 is
+    # looked up by its bigrams, a single character by its unigram
+    s = (name or "").lower()
+    grams = {ch for ch in s if not ch.isspace()}
+    grams.update(s[i:i + 2] for i in range(len(s) - 1) if not s[i:i + 2].isspace())
+    return grams
+
+
+def _query_grams(term: str) -> Set[str]:
+    s = term.lower()
+    if len(s) < 2:
+        return {s}
+    return {s[i:i + 2] for i in range(len(s) - 1) if not s[i:i + 2].isspace()}
+
+
+def index_customer_name(db: Session, customer_id: int, name: str):
+    """(Re)build the gram rows of one customer; call inside the customer's transaction."""
+    unindex_customer(db, customer_id)
+    grams = name_grams(name)
+    if grams:
+        db.execute(insert(CustomerNameGram), [{"gram": g, "customer_id": customer_id} for g in grams])
+
+
+def unindex_customer(db: Session, customer_id: int):
+    db.execute(delete(CustomerNameGram).where(CustomerNameGram.customer_id == customer_id))
+
+
+def matching_customer_ids(term: str):
+    """Select of customer ids whose name contains ``term`` (case-insensitive).
+
+    Candidates come from the gram index (every query gram must be present);
+    the ILIKE recheck only runs on those candidates and drops rows whose grams
+    matched but are not contiguous.
+    """
+    term = term.strip()
+    grams = _query_grams(term)
+    candidates = (
+        select(CustomerNameGram.customer_id)
+        .where(CustomerNameGram.gram.in_(grams))
+        .group_by(CustomerNameGram.customer_id)
+        .having(func.count(func.distinct(CustomerNameGram.gram)) == len(grams))
+    )
+    return select(Customer.id).where(Customer.id.in_(candidates), Customer.name.ilike(f"%{term}%"))
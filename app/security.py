@@ -1,19 +1,40 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with a different cost than bcrypt_rounds are reported by verify_and_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt is CPU-bound by design; a small dedicated pool caps how many run at once
+# so a login burst queues here instead of exhausting the request threadpool
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
 
 
 def get_password_hash(password: str) -> str:
+    # Outside request handling only (startup seeding, scripts)
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def aget_password_hash(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.hash, password)
+
+
+async def averify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the bcrypt pool; also returns a new hash when the stored cost is outdated."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def adummy_verify():
+    # Same cost as a real verification; used when the user does not exist
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_hash_executor, pwd_context.dummy_verify)
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -0,0 +1,145 @@
+"""Incremental maintenance of the ``stats_daily`` and ``stats_monthly`` rollups.
+
+Every change to the set of approved applications goes through ``apply_deltas``
+in the same transaction as the change itself: approvals add one, and admin
+edits, deletes or customer re-classification move or remove counts.
+``rebuild`` recomputes both tables from ``applications`` (migration backfill and
+scripts/rebuild_stats.py).
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import Integer, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.cache import bump_version
+from app.models import Application, ApplicationStatus, Customer, StatsDaily, StatsMonthly
+
+
+# cache_versions row bumped with every rollup change; stats responses are cached under it
+STATS_CACHE = "stats"
+
+
+# (reviewed_at, industry, region, type, severity, reason_id, delta)
+Delta = Tuple[datetime, Optional[str], Optional[str], str, Optional[str], Optional[int], int]
+
+GROUP_COLUMNS = ["industry", "region", "type", "severity", "reason_id"]
+KEY_COLUMNS = ["year", "month"] + GROUP_COLUMNS
+DAILY_KEY_COLUMNS = ["day"] + GROUP_COLUMNS
+
+
+def _group(industry: Optional[str], region: Optional[str], type_: str, severity: Optional[str], reason_id: Optional[int]):
+    return (industry or "", region or "", type_, severity or "", reason_id or 0)
+
+
+def _portable_upsert(db: Session, model, index_elements: List[str], rows: List[dict]):
+    # Dialects without ON CONFLICT: bump existing keys, insert the rest
+    for row in rows:
+        key = [getattr(model, c) == row[c] for c in index_elements]
+        if not db.execute(update(model).where(*key).values(count=model.count + row["count"])).rowcount:
+            db.execute(insert(model).values(**row))
+
+
+def _upsert(db: Session, model, index_elements: List[str], rows: List[dict]):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        _portable_upsert(db, model, index_elements, rows)
+        return
+    db.execute(
+        stmt.on_conflict_do_update(index_elements=index_elements, set_={"count": model.count + stmt.excluded.count}),
+        rows,
+    )
+
+
+def apply_deltas(db: Session, deltas: Iterable[Delta]):
+    """Add the deltas to the daily and monthly rollups with one upsert each; caller commits."""
+    days = Counter()
+    for reviewed_at, *group, delta in deltas:
+        if reviewed_at is not None:
+            days[(reviewed_at.date(), *_group(*group))] += delta
+    months = Counter()
+    for (day, *group), n in days.items():
+        months[(day.year, day.month, *group)] += n
+    if not any(days.values()):
+        return
+    # Sorted keys keep lock order stable across concurrent reviewers
+    _upsert(db, StatsDaily, DAILY_KEY_COLUMNS, [
+        {**dict(zip(DAILY_KEY_COLUMNS, k)), "count": n} for k, n in sorted(days.items()) if n
+    ])
+    monthly = [{**dict(zip(KEY_COLUMNS, k)), "count": n} for k, n in sorted(months.items()) if n]
+    if monthly:
+        _upsert(db, StatsMonthly, KEY_COLUMNS, monthly)
+    bump_version(db, STATS_CACHE)
+
+
+def record_approvals(db: Session, rows):
+    """Count freshly approved applications (rows with ``reviewed_at``, ``type``, ``severity``, ``reason_id`` and ``customer_id``)."""
+    customer_ids = {r.customer_id for r in rows}
+    if not customer_ids:
+        return
+    customers = {
+        c.id: c for c in db.execute(select(Customer.id, Customer.industry, Customer.region).where(Customer.id.in_(customer_ids)))
+    }
+    apply_deltas(db, [
+        (r.reviewed_at, customers[r.customer_id].industry, customers[r.customer_id].region, r.type, r.severity, r.reason_id, 1)
+        for r in rows
+    ])
+
+
+def move_customer(db: Session, customer_id: int, old: Tuple[Optional[str], Optional[str]], new: Tuple[Optional[str], Optional[str]]):
+    """Re-file a customer's approved applications after its industry/region changed."""
+    if old == new:
+        return
+    apps = db.execute(
+        select(Application.reviewed_at, Application.type, Application.severity, Application.reason_id)
+        .where(Application.customer_id == customer_id, Application.status == ApplicationStatus.approved.value)
+    ).all()
+    deltas: List[Delta] = []
+    for a in apps:
+        deltas.append((a.reviewed_at, old[0], old[1], a.type, a.severity, a.reason_id, -1))
+        deltas.append((a.reviewed_at, new[0], new[1], a.type, a.severity, a.reason_id, 1))
+    apply_deltas(db, deltas)
+
+
+def application_delta(db: Session, app: Application, delta: int) -> List[Delta]:
+    # The rollup entry of one approved application, with the given sign
+    if app.status != ApplicationStatus.approved.value or app.reviewed_at is None:
+        return []
+    c = db.get(Customer, app.customer_id)
+    return [(app.reviewed_at, c.industry if c else None, c.region if c else None, app.type, app.severity, app.reason_id, delta)]
+
+
+def rebuild(db: Session):
+    """Recompute the whole rollup from applications; caller commits.
+
+    Like ``apply_deltas``, only the daily rollup is grouped from ``reviewed_at``;
+    the months are sums of its days, so both tables share one source of truth.
+    """
+    day = func.date(Application.reviewed_at)
+    group = (
+        func.coalesce(Customer.industry, ""), func.coalesce(Customer.region, ""), Application.type,
+        func.coalesce(Application.severity, ""), func.coalesce(Application.reason_id, 0),
+    )
+    db.execute(delete(StatsDaily))
+    db.execute(insert(StatsDaily).from_select(
+        DAILY_KEY_COLUMNS + ["count"],
+        select(day, *group, func.count())
+        .select_from(Application)
+        .join(Customer, Application.customer_id == Customer.id)
+        .where(Application.status == ApplicationStatus.approved.value, Application.reviewed_at.is_not(None))
+        .group_by(day, *group),
+    ))
+    # extract() compiles per dialect
+    year = cast(func.extract("year", StatsDaily.day), Integer)
+    month = cast(func.extract("month", StatsDaily.day), Integer)
+    daily_group = [getattr(StatsDaily, c) for c in GROUP_COLUMNS]
+    db.execute(delete(StatsMonthly))
+    db.execute(insert(StatsMonthly).from_select(
+        KEY_COLUMNS + ["count"],
+        select(year, month, *daily_group, func.sum(StatsDaily.count)).group_by(year, month, *daily_group),
+    ))
+    bump_version(db, STATS_CACHE)
@@ -1,40 +1,154 @@
+import asyncio
+import hashlib
+import io
 import os
+import threading
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
-import boto3
-from botocore.client import Config as BotoConfig
+import anyio
 
 from app.core.config import settings
 
 
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredObject:
+    url: str
+    size: int
+    checksum: str  # sha256 hex digest
+
+
 class Storage:
     def __init__(self):
         self.backend = settings.storage_backend.lower()
         if self.backend == "s3":
+            # boto3 is only needed (and imported) when the S3 backend is selected
+            import boto3
+            from botocore.client import Config as BotoConfig
+
+            # boto3 clients are thread-safe; one client keeps one shared connection pool
             self._client = boto3.client(
                 "s3",
                 endpoint_url=settings.s3_endpoint or None,
                 aws_access_key_id=settings.s3_access_key,
                 aws_secret_access_key=settings.s3_secret_key,
-                config=BotoConfig(signature_version="s3v4"),
+                config=BotoConfig(signature_version="s3v4", max_pool_connections=settings.s3_max_pool_connections),
                 region_name=settings.s3_region or "us-east-1",
             )
             self.bucket = settings.s3_bucket
         else:
             Path(settings.local_storage_dir).mkdir(parents=True, exist_ok=True)
+        self._limiter = None
+        self._limiter_loop = None
 
     def save(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        return self.save_stream(key, io.BytesIO(data), content_type).url
+
+    def save_stream(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None, max_bytes: Optional[int] = None) -> StoredObject:
+        """Copy ``fileobj`` to storage in fixed-size chunks, never holding the whole file.
+
+        Raises UploadTooLarge as soon as more than ``max_bytes`` have been read;
+        nothing is left behind in storage in that case.
+        """
         if self.backend == "s3":
-            extra = {"ContentType": content_type} if content_type else {}
-            self._client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
-            base = settings.public_base_url.rstrip("/") if settings.public_base_url else ""
-            return f"{base}/{key}" if base else key
+            return self._save_s3(key, fileobj, content_type, max_bytes)
+        return self._save_local(key, fileobj, max_bytes)
+
+    def _chunks(self, fileobj: BinaryIO, digest, max_bytes: Optional[int]):
+        size = 0
+        while True:
+            chunk = fileobj.read(settings.upload_chunk_size)
+            if not chunk:
+                return
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            yield chunk
+
+    def _save_local(self, key: str, fileobj: BinaryIO, max_bytes: Optional[int]) -> StoredObject:
+        path = Path(settings.local_storage_dir) / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a sibling temp file so readers never see a partial upload
+        tmp = path.with_name(path.name + ".part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp, "wb") as out:
+                for chunk in self._chunks(fileobj, digest, max_bytes):
+                    out.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return StoredObject(url=f"/files/{key}", size=size, checksum=digest.hexdigest())
+
+    def _save_s3(self, key: str, fileobj: BinaryIO, content_type: Optional[str], max_bytes: Optional[int]) -> StoredObject:
+        extra = {"ContentType": content_type} if content_type else {}
+        digest = hashlib.sha256()
+        chunks = self._chunks(fileobj, digest, max_bytes)
+        # Buffer up to the threshold; small files go out as a single PUT
+        buf = bytearray()
+        for chunk in chunks:
+            buf += chunk
+            if len(buf) > settings.s3_multipart_threshold:
+                break
         else:
-            path = Path(settings.local_storage_dir) / key
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_bytes(data)
-            return f"/files/{key}"
+            self._client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buf), **extra)
+            return StoredObject(url=self._public_url(key), size=len(buf), checksum=digest.hexdigest())
+
+        part_size = max(settings.s3_multipart_part_size, 5 * 1024 * 1024)
+        upload_id = self._client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra)["UploadId"]
+        parts = []
+        size = 0
+        try:
+            def flush(data: bytes):
+                resp = self._client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=len(parts) + 1, Body=data,
+                )
+                parts.append({"ETag": resp["ETag"], "PartNumber": len(parts) + 1})
+
+            for chunk in chunks:
+                buf += chunk
+                while len(buf) >= part_size:
+                    flush(bytes(buf[:part_size]))
+                    size += part_size
+                    del buf[:part_size]
+            if buf or not parts:
+                flush(bytes(buf))
+                size += len(buf)
+            self._client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self._client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        return StoredObject(url=self._public_url(key), size=size, checksum=digest.hexdigest())
+
+    def _public_url(self, key: str) -> str:
+        base = settings.public_base_url.rstrip("/") if settings.public_base_url else ""
+        return f"{base}/{key}" if base else key
+
+    def _io_limiter(self) -> anyio.CapacityLimiter:
+        # Storage I/O gets its own thread budget so slow uploads don't use up
+        # the threadpool FastAPI runs sync endpoints and dependencies on
+        loop = asyncio.get_running_loop()
+        if self._limiter is None or self._limiter_loop is not loop:
+            self._limiter = anyio.CapacityLimiter(settings.storage_io_threads)
+            self._limiter_loop = loop
+        return self._limiter
+
+    async def asave_stream(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None, max_bytes: Optional[int] = None) -> StoredObject:
+        return await anyio.to_thread.run_sync(
+            partial(self.save_stream, key, fileobj, content_type, max_bytes), limiter=self._io_limiter()
+        )
 
     def get_presigned_url(self, key: str, expires_in: int = 3600) -> Optional[str]:
         if self.backend == "s3":
@@ -44,3 +158,17 @@ class Storage:
                 ExpiresIn=expires_in,
             )
         return None
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """Process-wide Storage, created on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = Storage()
+    return _storage
@@ -0,0 +1,59 @@
+"""Cap on attachment upload bodies, enforced while the body is being received.
+
+Starlette spools a whole multipart body to a temp file before the endpoint
+runs, so the storage-side ``max_upload_bytes`` check alone cannot keep a large
+body off the worker's disk. This middleware rejects an oversized
+``Content-Length`` up front and counts chunked/undeclared bodies as they
+arrive, answering 413 and cutting the stream once the cap is passed.
+"""
+import re
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+
+UPLOAD_PATH = re.compile(r"^/applications/\d+/attachments/?$")
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _too_large():
+    return JSONResponse({"detail": "Attachment too large"}, status_code=413)
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not UPLOAD_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        limit = settings.max_upload_bytes + MULTIPART_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await _too_large()(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    await _too_large()(scope, receive, send)
+                    # The app sees a client disconnect and stops parsing the body
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # Whatever the app answers after the 413 has gone out is dropped
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
@@ -31,21 +31,32 @@ export default function Applications() {
   const [customers, setCustomers] = useState<Customer[]>([])
   const [apps, setApps] = useState<ApplicationRow[]>([])
   const [loading, setLoading] = useState(false)
+  const [cursor, setCursor] = useState<string | null>(null)
+  const [filters, setFilters] = useState<any>({})
   const [searchForm] = Form.useForm()
   const [createForm] = Form.useForm()
   const [createFiles, setCreateFiles] = useState<any[]>([])
 
+  // more=true appends the next (older) page of the same search
+  const loadApps = async (params: any, more = false) => {
+    const { data } = await http.get('/applications/search', {
+      params: { ...params, cursor: more ? cursor ?? undefined : undefined }
+    })
+    setApps(more ? (prev) => [...prev, ...data.items] : data.items)
+    setCursor(data.next_cursor ?? null)
+    setFilters(params)
+  }
+
   const load = async () => {
     setLoading(true)
     try {
-      const [rs, cs, as] = await Promise.all([
+      const [rs, cs] = await Promise.all([
         http.get('/reasons/'),
         http.get('/customers/'),
-        http.get('/applications/search')
+        loadApps({})
       ])
       setReasons(rs.data)
       setCustomers(cs.data)
-      setApps(as.data)
     } catch { message.error('加载失败') } finally { setLoading(false) }
   }
   useEffect(() => { load() }, [])
@@ -112,11 +123,17 @@ export default function Applications() {
     const v = await searchForm.getFieldsValue()
     setLoading(true)
     try {
-      const res = await http.get('/applications/search', { params: v })
-      setApps(res.data)
+      await loadApps(v)
     } finally { setLoading(false) }
   }
 
+  const loadMore = async () => {
+    setLoading(true)
+    try {
+      await loadApps(filters, true)
+    } catch { message.error('加载失败') } finally { setLoading(false) }
+  }
+
   return (
     <Space direction="vertical" style={{ width: '100%' }}>
   {role !== 'Reviewer' && (
@@ -200,7 +217,8 @@ export default function Applications() {
               </Space>
             )
           }}
-        ]} />
+        ]} pagination={false} />
+        {cursor && <Button style={{ marginTop: 12 }} loading={loading} onClick={loadMore}>加载更多</Button>}
       </Card>
     </Space>
   )
@@ -1,4 +1,4 @@
-import { Card, DatePicker, Input, Space, Table, message } from 'antd'
+import { Button, Card, DatePicker, Input, Space, Table, message } from 'antd'
 import dayjs, { Dayjs } from 'dayjs'
 import { useEffect, useState } from 'react'
 import { http } from '../lib/http'
@@ -19,8 +19,10 @@ export default function Audit() {
   const [action, setAction] = useState<string>()
   const [from, setFrom] = useState<Dayjs | null>()
   const [to, setTo] = useState<Dayjs | null>()
+  const [cursor, setCursor] = useState<string | null>(null)
 
-  const load = async () => {
+  // more=true appends the next (older) page
+  const load = async (more = false) => {
     setLoading(true)
     try {
       const { data } = await http.get('/audit-logs/', {
@@ -28,9 +30,12 @@ export default function Audit() {
           action,
           start: from?.toISOString(),
           end: to?.toISOString(),
+          cursor: more ? cursor ?? undefined : undefined,
         }
       })
-      setData(data.items || data)
+      const items = data.items || data
+      setData(more ? (prev) => [...prev, ...items] : items)
+      setCursor(data.next_cursor ?? null)
     } catch (e: any) {
       if (e?.response?.status === 401) message.error('无权限查看审计日志')
       else message.error('获取失败')
@@ -47,7 +52,7 @@ export default function Audit() {
           <Input placeholder="动作" value={action} onChange={e=>setAction(e.target.value)} style={{ width: 160 }} />
           <DatePicker placeholder="开始" showTime value={from||null} onChange={setFrom} />
           <DatePicker placeholder="结束" showTime value={to||null} onChange={setTo} />
-          <a onClick={load}>查询</a>
+          <a onClick={() => load()}>查询</a>
         </Space>
       </Card>
 
@@ -58,7 +63,8 @@ export default function Audit() {
           { title: '动作', dataIndex: 'action' },
           { title: '资源', dataIndex: 'resource' },
           { title: 'IP', dataIndex: 'ip' },
-        ]} />
+        ]} pagination={false} />
+        {cursor && <Button style={{ marginTop: 12 }} loading={loading} onClick={() => load(true)}>加载更多</Button>}
       </Card>
     </Space>
   )
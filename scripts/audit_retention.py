@@ -0,0 +1,41 @@
+"""
+Audit log retention job: archive and drop old monthly partitions of audit_logs.
+
+Usage:
+  uv run python scripts/audit_retention.py [--months N] [--archive-dir DIR]
+or
+  python scripts/audit_retention.py
+
+Run it daily (cron or a scheduled container). Each run rotates closed months into
+their own tables on SQLite, creates upcoming partitions on PostgreSQL, then
+writes every month older than the retention window to
+<archive-dir>/audit_logs_YYYYMM.ndjson.gz and drops its table. Safe to re-run.
+"""
+from __future__ import annotations
+
+import argparse
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.audit_partitions import apply_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--months", type=int, default=settings.audit_retention_months, help="months of audit logs to keep online")
+    parser.add_argument("--archive-dir", default=settings.audit_archive_dir)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        archived = apply_retention(db, months=args.months, archive_dir=args.archive_dir)
+    finally:
+        db.close()
+    if archived:
+        print(f"Archived and dropped audit_logs partitions: {', '.join(archived)}")
+    else:
+        print("No audit_logs partitions past retention.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Rebuild the stats_monthly and stats_daily rollups and the customer_default_periods
+history from the applications table.
+
+Usage:
+  uv run python scripts/rebuild_stats.py
+or
+  python scripts/rebuild_stats.py
+
+The rollup is kept current by every review/edit, so this is only needed after
+bulk data fixes done directly in the database. Safe to re-run.
+"""
+from __future__ import annotations
+
+from app.db.database import SessionLocal
+from app.default_periods import rebuild as rebuild_default_periods
+from app.stats_rollup import rebuild
+
+
+def main():
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        rebuild_default_periods(db)
+        db.commit()
+    finally:
+        db.close()
+    print("stats_monthly, stats_daily and customer_default_periods rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,9 @@ from app.models import (
     ApplicationAttachment,
 )
 from app.security import get_password_hash
+from app.search import index_customer_name
+from app.default_periods import rebuild as rebuild_default_periods
+from app.stats_rollup import rebuild as rebuild_stats
 
 
 rng = Random(42)
@@ -99,6 +102,8 @@ def upsert_customer(db: Session, name: str, industry: str, region: str, is_defau
         return c
     c = Customer(name=name, industry=industry, region=region, is_default=is_default)
     db.add(c)
+    db.flush()
+    index_customer_name(db, c.id, c.name)
     db.commit()
     db.refresh(c)
     return c
@@ -178,6 +183,11 @@ def main():
                 # Then REBIRTH to revert
                 create_application(db, operator, c, rebirth_reason, ApplicationType.rebirth.value, "LOW", "A", "经营好转", approve=True, reviewed_by=reviewer)
 
+        # Approvals above bypass the review endpoint, so recompute the stats rollup and default history
+        rebuild_stats(db)
+        rebuild_default_periods(db)
+        db.commit()
+
         print("Demo data seeded successfully.")
     finally:
         db.close()
@@ -0,0 +1,106 @@
+import gzip
+import json
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+from app.audit import audit_values
+from app.audit_partitions import add_months, apply_retention, list_partitions, month_key, rotate
+from app.db.database import SessionLocal
+from app.models import AuditLog
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def test_month_math():
+    assert add_months(datetime(2024, 11, 20), 3) == datetime(2025, 2, 1)
+    assert add_months(datetime(2024, 1, 5), -1) == datetime(2023, 12, 1)
+    assert month_key(datetime(2024, 3, 9)) == "202403"
+
+
+def test_rotate_prune_and_archive(client: TestClient, tmp_path):
+    admin = _login(client, "admin@example.com", "admin123")
+    db = SessionLocal()
+    try:
+        rows = []
+        for month, n in ((1, 3), (2, 2)):
+            for i in range(n):
+                rows.append({**audit_values(None, "POST", "HTTP", f"/retention/{month}"), "created_at": datetime(2001, month, 10 + i)})
+        db.execute(insert(AuditLog), rows)
+        db.commit()
+
+        assert rotate(db) == ["200101", "200102"]
+        assert {"200101", "200102"} <= set(list_partitions(db))
+        assert db.query(AuditLog).filter(AuditLog.target_id.like("/retention/%")).count() == 0
+
+        # a January query only reads the January shard next to the live table
+        with count_statements() as stmts:
+            r = client.get("/audit-logs/", params={"start": "2001-01-01T00:00:00", "end": "2001-01-31T23:59:59"}, headers=_auth(admin))
+        assert [x["resource"] for x in r.json()["items"]] == ["HTTP:/retention/1"] * 3
+        sql = " ".join(stmts)
+        assert "audit_logs_200101" in sql and "audit_logs_200102" not in sql
+
+        archived = apply_retention(db, months=12, archive_dir=str(tmp_path))
+        assert archived[:2] == ["200101", "200102"]
+        assert not {"200101", "200102"} & set(list_partitions(db))
+        lines = gzip.decompress((tmp_path / "audit_logs_200101.ndjson.gz").read_bytes()).decode().splitlines()
+        assert [json.loads(x)["target_id"] for x in lines] == ["/retention/1"] * 3
+    finally:
+        db.close()
+
+
+def test_ids_keep_growing_after_rotate_empties_the_live_table():
+    engine = create_engine("sqlite://")
+    AuditLog.__table__.create(engine)
+    with Session(engine) as db:
+        db.execute(insert(AuditLog), [
+            {**audit_values(None, "POST", "HTTP", "/ids"), "created_at": datetime(2001, 1, 5 + i)} for i in range(2)
+        ])
+        db.commit()
+        assert rotate(db, now=datetime(2001, 2, 1)) == ["200101"]
+        db.execute(insert(AuditLog), {**audit_values(None, "POST", "HTTP", "/ids"), "created_at": datetime(2001, 2, 3)})
+        db.commit()
+        moved = db.execute(text("SELECT max(id) FROM audit_logs_200101")).scalar()
+        assert db.execute(select(AuditLog.id)).scalar() == moved + 1
+    engine.dispose()
+
+
+def test_postgres_partitions_adopt_default_rows():
+    import os
+    import pytest
+    from app.audit_partitions import ensure_partitions
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    pg = create_engine(url)
+    with pg.connect() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS audit_partition_test CASCADE"))
+        conn.execute(text("CREATE SCHEMA audit_partition_test"))
+        conn.execute(text("SET search_path TO audit_partition_test"))
+        conn.execute(text("CREATE TABLE audit_logs (id integer, created_at timestamp NOT NULL) PARTITION BY RANGE (created_at)"))
+        conn.execute(text("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT"))
+        # rows for a past month and for the current one, before either has a partition
+        conn.execute(text("INSERT INTO audit_logs VALUES (1, '2001-03-05'), (2, '2024-05-06')"))
+        conn.commit()
+        try:
+            db = Session(bind=conn)
+            ensure_partitions(db, now=datetime(2024, 5, 1), months_ahead=1)
+            assert {"200103", "202405", "202406"} <= set(list_partitions(db))
+            assert db.execute(text("SELECT count(*) FROM audit_logs_default")).scalar() == 0
+            assert db.execute(text("SELECT id FROM audit_logs_200103")).scalars().all() == [1]
+            # a second run finds everything in place
+            ensure_partitions(db, now=datetime(2024, 5, 1), months_ahead=1)
+            db.close()
+        finally:
+            conn.execute(text("DROP SCHEMA audit_partition_test CASCADE"))
+            conn.commit()
+    pg.dispose()
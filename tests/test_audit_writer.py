@@ -0,0 +1,106 @@
+import threading
+import anyio
+from fastapi.testclient import TestClient
+from app.audit import AuditWriter, audit_values, audit_writer, route_codes
+from app.db.database import SessionLocal
+from app.models import AuditLog
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _count(target_id: str = None, route: str = None) -> int:
+    db = SessionLocal()
+    try:
+        q = db.query(AuditLog)
+        if route:
+            return q.filter(AuditLog.route_code == route_codes.get(route)).count()
+        return q.filter(AuditLog.target_id == target_id).count()
+    finally:
+        db.close()
+
+
+def test_writer_inserts_in_batches_and_flushes_on_stop(client: TestClient):
+    writer = AuditWriter(maxsize=1000, batch_size=50, flush_interval=5, enqueue_timeout=0.1)
+    # rows from earlier requests must not land inside the counted window
+    client.portal.call(audit_writer.flush)
+
+    async def main():
+        writer.start()
+        for _ in range(120):
+            await writer.enqueue(audit_values(None, "POST", "HTTP", "/batched"))
+        await writer.stop()
+
+    with count_statements(include_background=True) as stmts:
+        anyio.run(main)
+    assert writer.written == 120 and writer.batches == 3
+    assert sum(s.startswith("INSERT INTO audit_logs") for s in stmts) == 3
+    assert _count("/batched") == 120
+
+
+def test_writer_drops_when_full(client: TestClient):
+    writer = AuditWriter(maxsize=2, batch_size=10, flush_interval=0.01, enqueue_timeout=0.01)
+    gate = threading.Event()
+    writer._insert = lambda rows: gate.wait(5)  # a stalled database
+
+    async def main():
+        writer.start()
+        # the first batch (up to 10) is stuck in the insert; 2 more fit in the queue
+        for _ in range(30):
+            await writer.enqueue(audit_values(None, "POST", "HTTP", "/dropped"))
+        assert writer.metrics()["queue_depth"] == 2
+        gate.set()
+        await writer.stop()
+
+    anyio.run(main)
+    assert writer.dropped > 0
+    assert writer.metrics()["queue_depth"] == 0
+
+
+def test_middleware_rows_are_queued_and_metrics_exposed(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/customers/", json={"name": "QueuedAuditCo", "industry": "Q", "region": "Q"}, headers=_auth(admin))
+    assert r.status_code == 200
+    client.portal.call(audit_writer.flush)
+    assert _count(route="/customers/") >= 1
+
+    r = client.get("/audit-logs/metrics", headers=_auth(admin))
+    assert r.status_code == 200
+    m = r.json()
+    assert m["running"] and m["written"] >= 1 and m["queue_capacity"] == audit_writer.maxsize
+    op = _login(client, "operator@example.com", "operator123")
+    assert client.get("/audit-logs/metrics", headers=_auth(op)).status_code == 403
+
+
+def test_writer_never_loses_rows_at_the_batch_deadline():
+    # A tiny flush interval makes rows arrive just as the batch deadline expires
+    writer = AuditWriter(maxsize=1000, batch_size=50, flush_interval=0.0005, enqueue_timeout=0.1)
+    written = []
+    writer._insert = lambda rows: written.extend(rows)
+
+    async def main():
+        import asyncio
+        writer.start()
+        for i in range(500):
+            await writer.enqueue({"n": i})
+            if i % 7 == 0:
+                await asyncio.sleep(0.0005)
+        with anyio.fail_after(5):
+            await writer.stop()
+
+        # a get that loses the race with its timeout leaves the row queued
+        writer._queue = asyncio.Queue()
+        writer._queue.put_nowait({"n": -1})
+        row = await writer._get(0)
+        assert row == {"n": -1} or writer._queue.qsize() == 1
+
+    anyio.run(main)
+    assert sorted(r["n"] for r in written) == list(range(500))
@@ -0,0 +1,97 @@
+from fastapi.testclient import TestClient
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _reason(client: TestClient, admin: str, t: str, desc: str, enabled: bool = True) -> int:
+    r = client.post("/reasons/", json={"type": t, "description": desc, "enabled": enabled, "sort_order": 60}, headers=_auth(admin))
+    return r.json()["id"]
+
+
+def _customer(client: TestClient, admin: str, name: str) -> int:
+    r = client.post("/customers/", json={"name": name, "industry": "BK", "region": "BK"}, headers=_auth(admin))
+    return r.json()["id"]
+
+
+def test_bulk_create_reports_per_item_errors(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    default_reason = _reason(client, admin, "DEFAULT", "BulkDef")
+    rebirth_reason = _reason(client, admin, "REBIRTH", "BulkReb")
+    disabled_reason = _reason(client, admin, "DEFAULT", "BulkOff", enabled=False)
+    customers = [_customer(client, admin, f"BulkCo{i}") for i in range(4)]
+
+    items = [
+        {"type": "DEFAULT", "customer_id": customers[0], "reason_id": default_reason, "severity": "HIGH"},
+        {"type": "REBIRTH", "customer_id": customers[1], "reason_id": rebirth_reason},
+        {"type": "DEFAULT", "customer_id": customers[2], "reason_id": disabled_reason},
+        {"type": "DEFAULT", "customer_id": 999999, "reason_id": default_reason},
+        {"type": "DEFAULT", "customer_id": customers[3], "reason_id": default_reason, "remark": "ok"},
+    ]
+    with count_statements() as stmts:
+        r = client.post("/applications/bulk", json={"items": items}, headers=_auth(admin))
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [c["index"] for c in body["created"]] == [0, 4]
+    assert {e["index"]: e["detail"] for e in body["errors"]} == {
+        1: "Customer is not default",
+        2: "Invalid reason",
+        3: "Customer not found",
+    }
+    # prefetch + two executemany inserts, independent of the item count
+    assert len(stmts) <= 8
+
+    for created in body["created"]:
+        r = client.get(f"/applications/{created['id']}", headers=_auth(admin))
+        assert r.status_code == 200
+        assert r.json()["status"] == "PENDING"
+        assert r.json()["customer_id"] == items[created["index"]]["customer_id"]
+
+
+def test_bulk_create_requires_operator_or_admin(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "bulkrev@example.com", "password": "bulkrev", "role": "Reviewer"}, headers=_auth(admin))
+    assert r.status_code == 200
+    rev = _login(client, "bulkrev@example.com", "bulkrev")
+    r = client.post("/applications/bulk", json={"items": []}, headers=_auth(rev))
+    assert r.status_code == 403
+
+
+def test_batch_review_applies_once_and_flips_customers(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    default_reason = _reason(client, admin, "DEFAULT", "BatchDef")
+    customers = [_customer(client, admin, f"BatchCo{i}") for i in range(3)]
+    r = client.post(
+        "/applications/bulk",
+        json={"items": [{"type": "DEFAULT", "customer_id": c, "reason_id": default_reason} for c in customers]},
+        headers=_auth(admin),
+    )
+    app_ids = [c["id"] for c in r.json()["created"]]
+
+    r = client.post("/applications/review/batch", json={"ids": app_ids[:2] + [999999], "decision": "APPROVED"}, headers=_auth(admin))
+    assert r.status_code == 200, r.text
+    assert r.json() == {"reviewed": app_ids[:2], "skipped": [999999]}
+    # a second reviewer submitting the same items does not re-apply the decision
+    r = client.post("/applications/review/batch", json={"ids": app_ids, "decision": "REJECTED"}, headers=_auth(admin))
+    assert r.json() == {"reviewed": app_ids[2:], "skipped": app_ids[:2]}
+
+    statuses = [client.get(f"/applications/{i}", headers=_auth(admin)).json()["status"] for i in app_ids]
+    assert statuses == ["APPROVED", "APPROVED", "REJECTED"]
+    flags = [client.get(f"/customers/{c}", headers=_auth(admin)).json()["is_default"] for c in customers]
+    assert flags == [True, True, False]
+    notes = client.get("/notifications/", headers=_auth(admin)).json()
+    assert any(n["content"] == f"Application #{app_ids[0]} APPROVED" for n in notes)
+
+
+def test_batch_review_rejects_invalid_decision(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/applications/review/batch", json={"ids": [1], "decision": "MAYBE"}, headers=_auth(admin))
+    assert r.status_code == 400
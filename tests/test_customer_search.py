@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _names(client: TestClient, token: str, q: str):
+    r = client.get("/customers/search", params={"q": q}, headers=_auth(token))
+    assert r.status_code == 200, r.text
+    return {c["name"] for c in r.json()}
+
+
+def test_customer_search_substring_rename_delete(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    ids = {}
+    for name in ("华东钢铁集团", "华南钢铁", "东方能源", "ab-bz Gram"):
+        r = client.post("/customers/", json={"name": name, "industry": "GS", "region": "GS"}, headers=_auth(admin))
+        assert r.status_code == 200
+        ids[name] = r.json()["id"]
+
+    assert _names(client, admin, "钢铁") >= {"华东钢铁集团", "华南钢铁"}
+    assert "东方能源" not in _names(client, admin, "钢铁")
+    assert _names(client, admin, "东钢") >= {"华东钢铁集团"}
+    assert "华南钢铁" not in _names(client, admin, "东钢")
+    # single character goes through the unigram rows
+    assert _names(client, admin, "能") >= {"东方能源"}
+    # case-insensitive, and grams present but not contiguous do not match
+    assert "ab-bz Gram" in _names(client, admin, "GRAM")
+    assert "ab-bz Gram" not in _names(client, admin, "abz")
+
+    r = client.patch(f"/customers/{ids['华南钢铁']}", json={"name": "华南有色"}, headers=_auth(admin))
+    assert r.status_code == 200
+    assert "华南钢铁" not in _names(client, admin, "钢铁")
+    assert "华南有色" in _names(client, admin, "有色")
+
+    r = client.delete(f"/customers/{ids['东方能源']}", headers=_auth(admin))
+    assert r.status_code == 200
+    assert "东方能源" not in _names(client, admin, "能源")
+
+
+def test_application_lists_filter_by_indexed_customer_name(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "GramReason", "enabled": True, "sort_order": 50}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    r = client.post("/customers/", json={"name": "西北重工机械", "industry": "GS", "region": "GS"}, headers=_auth(admin))
+    r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+    app_id = r.json()["id"]
+
+    r = client.get("/applications/", params={"customer_name": "重工"}, headers=_auth(admin))
+    assert [a["id"] for a in r.json()["items"]] == [app_id]
+    r = client.get("/applications/search", params={"customer_name": "重工机"}, headers=_auth(admin))
+    items = r.json()["items"]
+    assert [a["id"] for a in items] == [app_id]
+    assert items[0]["customer_name"] == "西北重工机械"
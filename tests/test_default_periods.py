@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.db.database import SessionLocal
+from app.default_periods import rebuild
+from app.models import CustomerDefaultPeriod
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _periods(customer_ids):
+    db = SessionLocal()
+    try:
+        return sorted(
+            (p.customer_id, p.started_at, p.ended_at, p.start_application_id, p.end_application_id)
+            for p in db.query(CustomerDefaultPeriod).filter(CustomerDefaultPeriod.customer_id.in_(customer_ids))
+        )
+    finally:
+        db.close()
+
+
+def test_default_periods_follow_reviews_and_answer_snapshots(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    client.post("/users/", json={"email": "periodrev@example.com", "password": "pr1", "role": "Reviewer"}, headers=_auth(admin))
+    reviewer = _login(client, "periodrev@example.com", "pr1")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "PeriodD", "enabled": True, "sort_order": 98}, headers=_auth(admin))
+    d_reason = r.json()["id"]
+    r = client.post("/reasons/", json={"type": "REBIRTH", "description": "PeriodR", "enabled": True, "sort_order": 98}, headers=_auth(admin))
+    r_reason = r.json()["id"]
+    cids, apps = [], []
+    for i in range(2):
+        r = client.post("/customers/", json={"name": f"PeriodCo{i}", "industry": "PeriodInd", "region": "PeriodReg"}, headers=_auth(admin))
+        cids.append(r.json()["id"])
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": cids[-1], "reason_id": d_reason}, headers=_auth(admin))
+        apps.append(r.json()["id"])
+    r = client.post("/applications/review/batch", json={"ids": apps, "decision": "APPROVED"}, headers=_auth(reviewer))
+    assert r.json()["reviewed"] == apps
+
+    r = client.get(f"/customers/{cids[0]}/default-periods", headers=_auth(admin))
+    (period,) = r.json()
+    assert period["start_application_id"] == apps[0] and period["ended_at"] is None
+    started = datetime.fromisoformat(period["started_at"])
+
+    # the first customer recovers
+    r = client.post("/applications/", json={"type": "REBIRTH", "customer_id": cids[0], "reason_id": r_reason}, headers=_auth(admin))
+    rebirth = r.json()["id"]
+    assert client.post(f"/applications/{rebirth}/review", json={"decision": "APPROVED"}, headers=_auth(reviewer)).status_code == 200
+    (period,) = client.get(f"/customers/{cids[0]}/default-periods", headers=_auth(admin)).json()
+    assert period["end_application_id"] == rebirth
+    ended = datetime.fromisoformat(period["ended_at"])
+
+    def industry_count(path, params):
+        r = client.get(path, params={**params, "by": "industry"}, headers=_auth(admin))
+        assert r.status_code == 200, r.text
+        return next((g["count"] for g in r.json()["groups"] if g["industry"] == "PeriodInd"), 0)
+
+    with count_statements() as stmts:
+        during = industry_count("/stats/defaults/snapshot", {"at": (started + (ended - started) / 2).isoformat()})
+    # one indexed query over the periods
+    assert sum("customer_default_periods" in s for s in stmts) == 1
+    assert during == 2
+    assert industry_count("/stats/defaults/snapshot", {}) == 1
+    assert industry_count("/stats/defaults/snapshot", {"at": (started - timedelta(seconds=1)).isoformat()}) == 0
+    window = {"start": (ended + timedelta(seconds=1)).isoformat(), "end": (ended + timedelta(days=1)).isoformat()}
+    assert industry_count("/stats/defaults/overlap", window) == 1
+    window["start"] = (started - timedelta(days=1)).isoformat()
+    assert industry_count("/stats/defaults/overlap", window) == 2
+
+    assert client.get("/stats/defaults/snapshot", params={"by": "color"}, headers=_auth(admin)).status_code == 400
+    assert client.get("/stats/defaults/overlap", params={"start": window["end"], "end": window["start"]}, headers=_auth(admin)).status_code == 400
+
+    incremental = _periods(cids)
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    assert _periods(cids) == incremental
+
+
+def test_admin_edits_and_deletes_move_default_periods(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    client.post("/users/", json={"email": "periodrev2@example.com", "password": "pr2", "role": "Reviewer"}, headers=_auth(admin))
+    reviewer = _login(client, "periodrev2@example.com", "pr2")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "PeriodEditD", "enabled": True, "sort_order": 98}, headers=_auth(admin))
+    reason = r.json()["id"]
+    cids = [
+        client.post("/customers/", json={"name": f"PeriodEditCo{i}"}, headers=_auth(admin)).json()["id"]
+        for i in range(2)
+    ]
+    r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": cids[0], "reason_id": reason}, headers=_auth(admin))
+    app_id = r.json()["id"]
+    assert client.post(f"/applications/{app_id}/review", json={"decision": "APPROVED"}, headers=_auth(reviewer)).status_code == 200
+    assert [p[0] for p in _periods(cids)] == [cids[0]]
+
+    # moving the approved DEFAULT to another customer moves its period
+    r = client.patch(f"/applications/{app_id}", json={"customer_id": cids[1]}, headers=_auth(admin))
+    assert r.status_code == 200, r.text
+    assert [(p[0], p[2], p[3]) for p in _periods(cids)] == [(cids[1], None, app_id)]
+
+    # deleting it removes the period it opened
+    assert client.delete(f"/applications/{app_id}", headers=_auth(admin)).status_code == 200
+    assert _periods(cids) == []
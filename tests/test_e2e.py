@@ -149,7 +149,7 @@ def test_end_to_end(client: TestClient):
     # 13) search applications by name and status
     r = client.get("/applications/", params={"customer_name": "Contoso"}, headers=auth_header(admin_token))
     assert r.status_code == 200
-    assert len(r.json()) >= 2
+    assert len(r.json()["items"]) >= 2
 
     # 14) stats for current year should reflect at least one APPROVED default
     year = datetime.utcnow().year
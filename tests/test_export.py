@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.audit import audit_values
+from app.db.database import SessionLocal
+from app.models import AuditLog
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def test_export_applications_csv_ndjson_gzip_and_scope(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "expop@example.com", "password": "expop", "role": "Operator", "full_name": "ExpOp"}, headers=_auth(admin))
+    op = _login(client, "expop@example.com", "expop")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "ExportReason", "enabled": True, "sort_order": 80}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    mine = []
+    for i in range(3):
+        r = client.post("/customers/", json={"name": f"导出客户{i}", "industry": "EX", "region": "EX"}, headers=_auth(admin))
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(op))
+        mine.append(r.json()["id"])
+    r = client.post("/customers/", json={"name": "导出客户X", "industry": "EX", "region": "EX"}, headers=_auth(admin))
+    r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+    other = r.json()["id"]
+
+    r = client.get("/applications/export", params={"format": "csv", "customer_name": "导出客户"}, headers=_auth(admin))
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.content.decode("utf-8-sig"))))
+    assert [int(x["id"]) for x in rows] == sorted(mine + [other], reverse=True)
+    assert rows[0]["reason_description"] == "ExportReason"
+
+    # operators only export their own applications
+    r = client.get("/applications/export", params={"format": "ndjson", "customer_name": "导出客户"}, headers=_auth(op))
+    lines = [json.loads(x) for x in r.text.splitlines()]
+    assert [x["id"] for x in lines] == sorted(mine, reverse=True)
+    assert lines[0]["created_by_name"] == "ExpOp"
+
+    r = client.get("/applications/export", params={"format": "ndjson", "gzip": True, "customer_name": "导出客户"}, headers=_auth(op))
+    assert r.headers["content-type"] == "application/gzip"
+    assert r.headers["content-disposition"].endswith('applications.ndjson.gz"')
+    assert len(gzip.decompress(r.content).decode().splitlines()) == 3
+
+    r = client.get("/applications/export", params={"format": "xml"}, headers=_auth(admin))
+    assert r.status_code == 400
+
+
+def test_export_audit_logs_streams_all_rows(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "auditexp@example.com", "password": "ae1", "role": "Operator", "full_name": "AuditExp"}, headers=_auth(admin))
+    uid = r.json()["id"]
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog), [audit_values(uid, "LOGIN", "User", str(uid), f"n={i}") for i in range(150)])
+        db.commit()
+    finally:
+        db.close()
+
+    # no 100-row cap; gzip NDJSON by default, oldest first
+    r = client.get("/audit-logs/export", params={"user_id": uid}, headers=_auth(admin))
+    assert r.status_code == 200 and r.headers["content-type"] == "application/gzip"
+    lines = [json.loads(x) for x in gzip.decompress(r.content).decode().splitlines()]
+    assert len(lines) == 150
+    assert [x["details"] for x in lines[:2]] == ["n=0", "n=1"]
+    assert lines[0]["action"] == "登录" and lines[0]["actor"] == "AuditExp" and lines[0]["resource"] == f"User:{uid}"
+
+    r = client.get("/audit-logs/export", params={"user_id": uid, "format": "csv", "gzip": False, "action": "登录"}, headers=_auth(admin))
+    rows = list(csv.DictReader(io.StringIO(r.content.decode("utf-8-sig"))))
+    assert len(rows) == 150 and rows[0]["user_id"] == str(uid)
+
+    op = _login(client, "auditexp@example.com", "ae1")
+    assert client.get("/audit-logs/export", headers=_auth(op)).status_code == 403
@@ -0,0 +1,50 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+
+# (expected index, query) pairs for the hot paths covered by 0003_hot_path_indexes
+HOT_PATHS = [
+    ("ix_applications_created_by_created_at",
+     "SELECT id FROM applications WHERE created_by = 1 ORDER BY created_at DESC"),
+    ("ix_applications_status_reviewed_at",
+     "SELECT id FROM applications WHERE status = 'APPROVED' "
+     "AND reviewed_at >= '2024-01-01' AND reviewed_at < '2025-01-01'"),
+    ("ix_applications_status_created_at",
+     "SELECT id FROM applications WHERE status = 'PENDING' ORDER BY created_at DESC"),
+    ("ix_applications_customer_id",
+     "SELECT id FROM applications WHERE customer_id = 1"),
+    ("ix_audit_logs_user_id_created_at",
+     "SELECT id FROM audit_logs WHERE user_id = 1 ORDER BY created_at DESC"),
+    ("ix_audit_logs_created_at",
+     "SELECT id FROM audit_logs WHERE created_at >= '2024-01-01' ORDER BY created_at DESC"),
+    ("ix_notifications_user_id_created_at",
+     "SELECT id FROM notifications WHERE user_id = 1 ORDER BY created_at DESC"),
+]
+
+
+@pytest.mark.parametrize("index_name,sql", HOT_PATHS)
+def test_sqlite_planner_uses_hot_path_indexes(client: TestClient, index_name: str, sql: str):
+    from app.db.database import engine
+    if engine.dialect.name != "sqlite":
+        pytest.skip("SQLite-specific plan check")
+    with engine.connect() as conn:
+        plan = " ".join(str(r[-1]) for r in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert index_name in plan, plan
+
+
+@pytest.mark.parametrize("index_name,sql", HOT_PATHS)
+def test_postgres_planner_uses_hot_path_indexes(index_name: str, sql: str):
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    from app.models import Base
+    pg = create_engine(url)
+    Base.metadata.create_all(bind=pg)
+    with pg.connect() as conn:
+        # tiny test tables would otherwise always be seq-scanned
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = " ".join(r[0] for r in conn.execute(text(f"EXPLAIN {sql}")))
+    pg.dispose()
+    assert index_name in plan, plan
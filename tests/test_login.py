@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+import app.security as security
+from app.db.database import SessionLocal
+from app.models import User
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _stored_hash(email: str) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(User).filter(User.email == email).first().hashed_password
+    finally:
+        db.close()
+
+
+def test_login_does_not_seed(client: TestClient):
+    with count_statements() as stmts:
+        _login(client, "admin@example.com", "admin123")
+    assert not any(s.startswith("INSERT INTO users") for s in stmts)
+    assert sum("FROM users" in s for s in stmts) == 1
+
+
+def test_unknown_user_and_wrong_password_are_rejected(client: TestClient):
+    r = client.post("/auth/token", data={"username": "nobody@example.com", "password": "x"})
+    assert r.status_code == 401
+    r = client.post("/auth/token", data={"username": "admin@example.com", "password": "wrong"})
+    assert r.status_code == 401
+
+
+def test_login_rehashes_when_cost_changes(client: TestClient, monkeypatch):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "rehash@example.com", "password": "rh1", "role": "Operator"}, headers=_auth(admin))
+    assert r.status_code == 200
+    old = _stored_hash("rehash@example.com")
+    assert not old.startswith("$2b$05$")
+
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    _login(client, "rehash@example.com", "rh1")
+    new = _stored_hash("rehash@example.com")
+    assert new.startswith("$2b$05$")
+    # the rehashed password still works
+    _login(client, "rehash@example.com", "rh1")
+
+
+def test_user_admin_hashes_on_the_bcrypt_pool(client: TestClient, monkeypatch):
+    import threading
+    threads = []
+
+    class Recording(CryptContext):
+        def hash(self, secret, **kwargs):
+            threads.append(threading.current_thread().name)
+            return super().hash(secret, **kwargs)
+
+    admin = _login(client, "admin@example.com", "admin123")
+    monkeypatch.setattr(security, "pwd_context", Recording(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    r = client.post("/users/", json={"email": "poolhash@example.com", "password": "ph1", "role": "Operator"}, headers=_auth(admin))
+    assert r.status_code == 200
+    r = client.patch(f"/users/{r.json()['id']}", json={"password": "ph2"}, headers=_auth(admin))
+    assert r.status_code == 200
+    assert len(threads) == 2 and all(t.startswith("bcrypt") for t in threads)
+    _login(client, "poolhash@example.com", "ph2")
@@ -97,7 +97,7 @@ def test_applications_search_returns_rich_fields(client: TestClient):
     admin = _login(client, "admin@example.com", "admin123")
     r = client.get("/applications/search", headers=_auth(admin))
     assert r.status_code == 200
-    arr = r.json()
+    arr = r.json()["items"]
     # shape check if any
     if arr:
         a = arr[0]
@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _setup_apps(client: TestClient, admin: str, prefix: str, n: int):
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": f"{prefix}Reason", "enabled": True, "sort_order": 30}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    ids = []
+    for i in range(n):
+        r = client.post("/customers/", json={"name": f"{prefix}{i}", "industry": "PG", "region": "PG"}, headers=_auth(admin))
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_list_applications_cursor_walks_all_pages(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    ids = _setup_apps(client, admin, "PageCo", 5)
+    seen = []
+    cursor = None
+    while True:
+        params = {"customer_name": "PageCo", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/applications/", params=params, headers=_auth(admin))
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert len(body["items"]) <= 2
+        seen.extend(a["id"] for a in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    # newest first, no duplicates or gaps
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_search_cursor_and_operator_scope(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "pageop@example.com", "password": "pageop", "role": "Operator"}, headers=_auth(admin))
+    assert r.status_code == 200
+    op = _login(client, "pageop@example.com", "pageop")
+    _setup_apps(client, admin, "PageAdm", 2)
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "PageOpReason", "enabled": True, "sort_order": 31}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    mine = []
+    for i in range(3):
+        r = client.post("/customers/", json={"name": f"PageOp{i}"}, headers=_auth(op))
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(op))
+        mine.append(r.json()["id"])
+
+    r = client.get("/applications/search", params={"limit": 2}, headers=_auth(op))
+    assert r.status_code == 200
+    first = r.json()
+    assert [a["id"] for a in first["items"]] == sorted(mine, reverse=True)[:2]
+    r = client.get("/applications/search", params={"limit": 2, "cursor": first["next_cursor"]}, headers=_auth(op))
+    second = r.json()
+    assert [a["id"] for a in second["items"]] == sorted(mine, reverse=True)[2:]
+    assert second["next_cursor"] is None
+
+
+def test_invalid_cursor_rejected(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.get("/applications/", params={"cursor": "not-a-cursor"}, headers=_auth(admin))
+    assert r.status_code == 400
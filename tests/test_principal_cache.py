@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.audit import audit_writer, route_codes
+from app.cache import bump_version
+from app.db.database import SessionLocal
+from app.deps import principal_cache
+from app.models import AuditLog, CacheVersion
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def test_cached_principal_skips_user_lookup(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    client.get("/users/me", headers=_auth(admin))
+    with count_statements() as stmts:
+        r = client.get("/users/me", headers=_auth(admin))
+    assert r.status_code == 200 and r.json()["email"] == "admin@example.com"
+    assert not any("FROM users" in s for s in stmts)
+
+
+def test_role_change_and_delete_invalidate(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/users/", json={"email": "cacheop@example.com", "password": "c1", "role": "Operator"}, headers=_auth(admin))
+    uid = r.json()["id"]
+    op = _login(client, "cacheop@example.com", "c1")
+    assert client.get("/users/", headers=_auth(op)).status_code == 403
+
+    r = client.patch(f"/users/{uid}", json={"role": "Admin"}, headers=_auth(admin))
+    assert r.status_code == 200
+    assert client.get("/users/", headers=_auth(op)).status_code == 200
+
+    r = client.delete(f"/users/{uid}", headers=_auth(admin))
+    assert r.status_code == 200
+    assert client.get("/users/me", headers=_auth(op)).status_code == 401
+
+
+def test_version_bump_from_another_worker_clears_cache(client: TestClient, monkeypatch):
+    admin = _login(client, "admin@example.com", "admin123")
+    monkeypatch.setattr(principal_cache, "check_interval", 0)
+    client.get("/users/me", headers=_auth(admin))
+    assert principal_cache.get("admin@example.com") is not None
+    before = principal_cache.version
+    # another process bumps the shared counter
+    db = SessionLocal()
+    try:
+        bump_version(db, principal_cache.name)
+        db.commit()
+    finally:
+        db.close()
+    with count_statements() as stmts:
+        client.get("/users/me", headers=_auth(admin))
+    assert principal_cache.version == before + 1
+    assert any("FROM users" in s for s in stmts)
+
+
+def test_audit_middleware_reuses_request_principal(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    me = client.get("/users/me", headers=_auth(admin)).json()
+    with count_statements() as stmts:
+        r = client.post("/customers/", json={"name": "PrincipalAuditCo", "industry": "P", "region": "P"}, headers=_auth(admin))
+    assert r.status_code == 200
+    # neither the dependency (cached) nor the middleware looks the user up again
+    assert not any("FROM users" in s for s in stmts)
+    client.portal.call(audit_writer.flush)
+    db = SessionLocal()
+    try:
+        row = db.query(AuditLog).filter(AuditLog.route_code == route_codes.get("/customers/")).order_by(AuditLog.id.desc()).first()
+    finally:
+        db.close()
+    assert row.user_id == me["id"]
+
+
+def test_version_moves_only_after_commit(client: TestClient):
+    def stored():
+        other = SessionLocal()
+        try:
+            return other.execute(select(CacheVersion.version).where(CacheVersion.name == "bump-test")).scalar() or 0
+        finally:
+            other.close()
+
+    before = stored()
+    db = SessionLocal()
+    try:
+        bump_version(db, "bump-test")
+        db.rollback()
+        assert stored() == before
+        bump_version(db, "bump-test")
+        # the writer's transaction never touches the shared row
+        assert stored() == before
+        db.commit()
+    finally:
+        db.close()
+    assert stored() == before + 1
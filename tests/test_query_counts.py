@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.db.database import engine
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+@contextmanager
+def count_statements(include_background: bool = False):
+    stmts = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # the audit writer flushes earlier requests at any moment, and caches poll
+        # cache_versions at most once per check interval, whenever that elapses
+        background = (
+            conn.get_execution_options().get("logging_token") == "audit_writer"
+            or statement.startswith("SELECT cache_versions.version")
+        )
+        if include_background or not background:
+            stmts.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        yield stmts
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+
+
+def test_search_and_detail_statement_count_is_bounded(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "QCReason", "enabled": True, "sort_order": 40}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    app_ids = []
+    for i in range(6):
+        r = client.post("/customers/", json={"name": f"QCount{i}", "industry": "QC", "region": "QC"}, headers=_auth(admin))
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+        app_ids.append(r.json()["id"])
+
+    with count_statements() as small:
+        r = client.get("/applications/search", params={"customer_name": "QCount", "limit": 1}, headers=_auth(admin))
+    assert r.status_code == 200 and len(r.json()["items"]) == 1
+    with count_statements() as large:
+        r = client.get("/applications/search", params={"customer_name": "QCount", "limit": 6}, headers=_auth(admin))
+    assert r.status_code == 200 and len(r.json()["items"]) == 6
+    item = r.json()["items"][0]
+    assert item["customer_name"].startswith("QCount")
+    assert item["reason_description"] == "QCReason"
+    assert item["created_by_name"] == "Admin"
+    # statements per request do not grow with the number of rows returned
+    assert len(large) == len(small) <= 3
+
+    with count_statements() as detail:
+        r = client.get(f"/applications/{app_ids[0]}", headers=_auth(admin))
+    assert r.status_code == 200
+    assert r.json()["reason_description"] == "QCReason"
+    assert len(detail) <= 3
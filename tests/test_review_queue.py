@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+from app.core.config import settings
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _reviewer(client: TestClient, admin: str, email: str) -> str:
+    r = client.post("/users/", json={"email": email, "password": "q123", "role": "Reviewer"}, headers=_auth(admin))
+    assert r.status_code == 200
+    return _login(client, email, "q123")
+
+
+def test_claims_are_disjoint_expire_and_guard_review(client: TestClient, monkeypatch):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "QueueReason", "enabled": True, "sort_order": 90}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    for i in range(4):
+        r = client.post("/customers/", json={"name": f"QueueCo{i}"}, headers=_auth(admin))
+        client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+    rev_a = _reviewer(client, admin, "qa@example.com")
+    rev_b = _reviewer(client, admin, "qb@example.com")
+
+    a = client.post("/applications/queue/claim", params={"limit": 2}, headers=_auth(rev_a)).json()
+    b = client.post("/applications/queue/claim", params={"limit": 2}, headers=_auth(rev_b)).json()
+    a_ids = [x["id"] for x in a]
+    b_ids = [x["id"] for x in b]
+    assert len(a_ids) == 2 and len(b_ids) == 2
+    assert not set(a_ids) & set(b_ids)
+    assert all(x["status"] == "PENDING" and x["claim_expires_at"] for x in a)
+    # polling again renews the same lease rather than handing out new rows
+    again = client.post("/applications/queue/claim", params={"limit": 2}, headers=_auth(rev_a)).json()
+    assert [x["id"] for x in again] == a_ids
+
+    # B cannot review A's leased item, A can
+    r = client.post(f"/applications/{a_ids[0]}/review", json={"decision": "REJECTED"}, headers=_auth(rev_b))
+    assert r.status_code == 409
+    r = client.post("/applications/review/batch", json={"ids": [a_ids[0]], "decision": "REJECTED"}, headers=_auth(rev_b))
+    assert r.json()["skipped"] == [a_ids[0]]
+    r = client.post(f"/applications/{a_ids[0]}/review", json={"decision": "REJECTED"}, headers=_auth(rev_a))
+    assert r.status_code == 200
+    assert r.json()["claimed_by"] is None
+
+    # released items go back to the queue
+    r = client.delete(f"/applications/{a_ids[1]}/claim", headers=_auth(rev_a))
+    assert r.json() == {"ok": True}
+    r = client.delete(f"/applications/{b_ids[0]}/claim", headers=_auth(rev_a))
+    assert r.json() == {"ok": False}
+
+    # expired leases can be taken over
+    monkeypatch.setattr(settings, "review_claim_ttl_seconds", -1)
+    client.post("/applications/queue/claim", params={"limit": 100}, headers=_auth(rev_b))
+    taken = client.post("/applications/queue/claim", params={"limit": 100}, headers=_auth(rev_a)).json()
+    assert set(b_ids) <= {x["id"] for x in taken}
+
+
+def test_queue_lookup_is_an_index_range_scan(client: TestClient):
+    from sqlalchemy import text
+    from app.db.database import engine
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        plan = " ".join(str(r[-1]) for r in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM applications WHERE status = 'PENDING' "
+            "AND (claimed_by IS NULL OR claim_expires_at < '2024-01-01') ORDER BY created_at, id LIMIT 10"
+        )))
+    # walks a pending-only index in queue order: no table scan, no sort step
+    assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
@@ -0,0 +1,250 @@
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from app.db.database import SessionLocal
+from app.models import StatsDaily, StatsMonthly
+from app.routers.stats import stats_cache
+from app.stats_rollup import rebuild
+from tests.test_query_counts import count_statements
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+def _industry(client, token, name):
+    r = client.get("/stats/industry", params={"year": datetime.utcnow().year, "detailed": True}, headers=_auth(token))
+    return next((x for x in r.json() if x["industry"] == name), None)
+
+
+def _rollup():
+    db = SessionLocal()
+    try:
+        monthly = sorted(
+            (s.year, s.month, s.industry, s.region, s.type, s.severity, s.reason_id, s.count)
+            for s in db.query(StatsMonthly) if s.count
+        )
+        daily = sorted((s.day, s.industry, s.region, s.type, s.severity, s.reason_id, s.count) for s in db.query(StatsDaily) if s.count)
+        return monthly, daily
+    finally:
+        db.close()
+
+
+def test_rollup_follows_reviews_edits_and_rebuild(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    client.post("/users/", json={"email": "rollrev@example.com", "password": "rr1", "role": "Reviewer"}, headers=_auth(admin))
+    reviewer = _login(client, "rollrev@example.com", "rr1")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "RollD", "enabled": True, "sort_order": 95}, headers=_auth(admin))
+    d_reason = r.json()["id"]
+    r = client.post("/reasons/", json={"type": "REBIRTH", "description": "RollR", "enabled": True, "sort_order": 95}, headers=_auth(admin))
+    r_reason = r.json()["id"]
+    cids, apps = [], []
+    for i in range(2):
+        r = client.post("/customers/", json={"name": f"RollCo{i}", "industry": "RollInd", "region": "RollReg"}, headers=_auth(admin))
+        cids.append(r.json()["id"])
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": cids[-1], "reason_id": d_reason}, headers=_auth(admin))
+        apps.append(r.json()["id"])
+    assert client.post(f"/applications/{apps[0]}/review", json={"decision": "APPROVED"}, headers=_auth(reviewer)).status_code == 200
+    r = client.post("/applications/review/batch", json={"ids": [apps[1]], "decision": "APPROVED"}, headers=_auth(reviewer))
+    assert r.json()["reviewed"] == [apps[1]]
+    r = client.post("/applications/", json={"type": "REBIRTH", "customer_id": cids[0], "reason_id": r_reason}, headers=_auth(admin))
+    client.post(f"/applications/{r.json()['id']}/review", json={"decision": "APPROVED"}, headers=_auth(reviewer))
+
+    with count_statements() as stmts:
+        item = _industry(client, admin, "RollInd")
+    # dashboards read the rollup only
+    assert not any("FROM applications" in s for s in stmts)
+    month = datetime.utcnow().month - 1
+    assert item["default_count"] == 2 and item["rebirth_count"] == 1
+    assert item["default_trend"][month] == 2 and item["rebirth_trend"][month] == 1
+
+    # re-classifying a customer moves its counts
+    client.patch(f"/customers/{cids[1]}", json={"industry": "RollInd2"}, headers=_auth(admin))
+    assert _industry(client, admin, "RollInd")["default_count"] == 1
+    assert _industry(client, admin, "RollInd2")["default_count"] == 1
+    # deleting an approved application removes it
+    assert client.delete(f"/applications/{apps[1]}", headers=_auth(admin)).status_code == 200
+    assert _industry(client, admin, "RollInd2") is None
+
+    incremental = _rollup()
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    assert _rollup() == incremental
+    # the months are exactly the days summed
+    monthly, daily = incremental
+    months = {}
+    for day, *group, n in daily:
+        key = (day.year, day.month, *group)
+        months[key] = months.get(key, 0) + n
+    assert sorted((*k, n) for k, n in months.items()) == monthly
+
+
+def test_stats_cache_etag_and_invalidation(client: TestClient, monkeypatch):
+    monkeypatch.setattr(stats_cache, "check_interval", 0)
+    admin = _login(client, "admin@example.com", "admin123")
+    year = datetime.utcnow().year
+    params = {"year": year, "detailed": True}
+    r = client.get("/stats/region", params=params, headers=_auth(admin))
+    etag = r.headers["etag"]
+    assert r.status_code == 200 and etag
+
+    with count_statements() as stmts:
+        r = client.get("/stats/region", params=params, headers={**_auth(admin), "If-None-Match": etag})
+        again = client.get("/stats/region", params=params, headers=_auth(admin))
+    assert r.status_code == 304 and r.content == b""
+    assert again.status_code == 200 and again.headers["etag"] == etag
+    # only the version check, no stats query
+    assert not any("stats_monthly" in s for s in stmts)
+
+    # an approval bumps the version and the old tag no longer matches
+    client.post("/users/", json={"email": "cacherev@example.com", "password": "cr1", "role": "Reviewer"}, headers=_auth(admin))
+    reviewer = _login(client, "cacherev@example.com", "cr1")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "CacheR", "enabled": True, "sort_order": 96}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    r = client.post("/customers/", json={"name": "CacheCo", "industry": "CacheInd", "region": "CacheReg"}, headers=_auth(admin))
+    r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+    client.post(f"/applications/{r.json()['id']}/review", json={"decision": "APPROVED"}, headers=_auth(reviewer))
+    r = client.get("/stats/region", params=params, headers={**_auth(admin), "If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+    assert any(x["region"] == "CacheReg" for x in r.json())
+
+
+def test_stats_cube_dimensions_measures_and_filters(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    client.post("/users/", json={"email": "cuberev@example.com", "password": "cu1", "role": "Reviewer"}, headers=_auth(admin))
+    reviewer = _login(client, "cuberev@example.com", "cu1")
+    reasons = []
+    for name in ("CubeA", "CubeB"):
+        r = client.post("/reasons/", json={"type": "DEFAULT", "description": name, "enabled": True, "sort_order": 97}, headers=_auth(admin))
+        reasons.append(r.json()["id"])
+    ids = []
+    for i, (severity, reason_id) in enumerate([("HIGH", reasons[0]), ("HIGH", reasons[0]), ("LOW", reasons[1])]):
+        r = client.post("/customers/", json={"name": f"CubeCo{i}", "industry": "CubeInd", "region": "CubeReg"}, headers=_auth(admin))
+        r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id, "severity": severity}, headers=_auth(admin))
+        ids.append(r.json()["id"])
+    r = client.post("/applications/review/batch", json={"ids": ids, "decision": "APPROVED"}, headers=_auth(reviewer))
+    assert r.json()["reviewed"] == ids
+
+    year, month = datetime.utcnow().year, datetime.utcnow().month
+    with count_statements() as stmts:
+        r = client.get("/stats/cube", params={"year": year, "dims": "severity,reason", "industry": "CubeInd"}, headers=_auth(admin))
+    assert r.status_code == 200, r.text
+    # cells, shares and trends from a single grouped query
+    assert sum("FROM stats_monthly" in s for s in stmts) == 1
+    body = r.json()
+    assert body["total"] == 3
+    high, low = body["cells"]
+    assert (high["severity"], high["reason"], high["reason_description"], high["count"]) == ("HIGH", reasons[0], "CubeA", 2)
+    assert high["share"] == 2 / 3 and high["trend"][month - 1] == 2
+    assert (low["severity"], low["count"], low["share"]) == ("LOW", 1, 1 / 3)
+
+    # month as a dimension replaces the trend array; measures can be narrowed
+    r = client.get("/stats/cube", params={"year": year, "dims": "month", "measures": "count", "industry": "CubeInd", "severity": "HIGH"}, headers=_auth(admin))
+    assert r.json()["cells"] == [{"month": month, "count": 2}]
+
+    r = client.get("/stats/cube", params={"year": year, "dims": "industry,color"}, headers=_auth(admin))
+    assert r.status_code == 400
+
+
+def test_stats_range_buckets_from_daily_rollup(client: TestClient):
+    admin = _login(client, "admin@example.com", "admin123")
+    days = {date(2023, 12, 31): 1, date(2024, 1, 1): 2, date(2024, 1, 7): 3, date(2024, 1, 8): 4, date(2024, 4, 2): 5}
+    db = SessionLocal()
+    try:
+        db.add_all([
+            StatsDaily(day=d, industry="RangeInd", region="RangeReg", type="DEFAULT", severity="", reason_id=0, count=n)
+            for d, n in days.items()
+        ])
+        db.commit()
+        params = {"start": "2024-01-01", "end": "2024-06-30", "industry": "RangeInd"}
+
+        with count_statements() as stmts:
+            r = client.get("/stats/range", params={**params, "granularity": "week"}, headers=_auth(admin))
+        assert r.status_code == 200, r.text
+        assert sum("FROM stats_daily" in s for s in stmts) == 1
+        body = r.json()
+        # 2024-01-01 is a Monday; days before start are not counted
+        assert body["periods"][:2] == ["2024-01-01", "2024-01-08"]
+        assert body["total"] == 14
+        assert body["series"][0]["counts"][:2] == [5, 4]
+
+        r = client.get("/stats/range", params={**params, "granularity": "quarter", "dims": "type"}, headers=_auth(admin))
+        body = r.json()
+        assert body["periods"] == ["2024-01-01", "2024-04-01"]
+        assert body["series"] == [{"type": "DEFAULT", "total": 14, "counts": [9, 5]}]
+
+        r = client.get("/stats/range", params={**params, "granularity": "year"}, headers=_auth(admin))
+        assert r.status_code == 400
+        r = client.get("/stats/range", params={"start": "2024-02-01", "end": "2024-01-01"}, headers=_auth(admin))
+        assert r.status_code == 400
+        r = client.get("/stats/range", params={"start": "2000-01-01", "end": "2024-01-01"}, headers=_auth(admin))
+        assert r.status_code == 400
+    finally:
+        db.query(StatsDaily).filter(StatsDaily.industry == "RangeInd").delete()
+        db.commit()
+        db.close()
+
+
+def test_portable_upsert_adds_to_existing_keys():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.stats_rollup import KEY_COLUMNS, _portable_upsert
+    engine = create_engine("sqlite://")
+    StatsMonthly.__table__.create(engine)
+    key = {"year": 2024, "month": 3, "industry": "P", "region": "P", "type": "DEFAULT", "severity": "", "reason_id": 0}
+    with Session(engine) as db:
+        _portable_upsert(db, StatsMonthly, KEY_COLUMNS, [{**key, "count": 2}])
+        _portable_upsert(db, StatsMonthly, KEY_COLUMNS, [{**key, "count": -1}, {**key, "month": 4, "count": 5}])
+        db.commit()
+        assert sorted((s.month, s.count) for s in db.query(StatsMonthly)) == [(3, 1), (4, 5)]
+    engine.dispose()
+
+
+def test_postgres_grouping_sets_cube_matches_sqlite():
+    import os
+    import pytest
+    from sqlalchemy import create_engine, delete, insert
+    from sqlalchemy.orm import Session
+    from app.models import Base, Reason
+    from app.routers.stats import MEASURES, stats_cube
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    year = 1999  # kept apart from anything else in the target database
+    rows = [
+        {"year": year, "month": m, "industry": i, "region": r, "type": t, "severity": "", "reason_id": 0, "count": c}
+        for m, i, r, t, c in [
+            (1, "PgA", "N", "DEFAULT", 3), (1, "PgA", "S", "REBIRTH", 1), (2, "PgA", "N", "DEFAULT", 2),
+            (5, "PgB", "N", "DEFAULT", 4), (12, "PgB", "S", "REBIRTH", 6), (12, "", "S", "DEFAULT", 1),
+        ]
+    ]
+    lite = create_engine("sqlite://")
+    Base.metadata.create_all(lite, tables=[StatsMonthly.__table__, Reason.__table__])
+    pg = create_engine(url)
+    Base.metadata.create_all(bind=pg)
+    try:
+        results = []
+        for engine in (lite, pg):
+            with Session(engine) as db:
+                db.execute(delete(StatsMonthly).where(StatsMonthly.year == year))
+                db.execute(insert(StatsMonthly), rows)
+                db.flush()
+                results.append([
+                    stats_cube(db, year, dims, MEASURES, filters)
+                    for dims, filters in [(["industry"], None), (["industry", "type"], None), (["region"], {"type": "DEFAULT"})]
+                ])
+                db.rollback()
+        assert results[0] == results[1]
+        assert results[1][0]["total"] == 17
+    finally:
+        lite.dispose()
+        pg.dispose()
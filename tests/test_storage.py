@@ -0,0 +1,158 @@
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.storage import Storage, UploadTooLarge
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    r = client.post("/auth/token", data={"username": email, "password": password})
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _auth(t: str):
+    return {"Authorization": f"Bearer {t}"}
+
+
+class FakeS3:
+    def __init__(self):
+        self.calls = []
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kw):
+        self.calls.append("put_object")
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, **kw):
+        self.calls.append("create_multipart_upload")
+        self.parts = []
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append("upload_part")
+        self.parts.append(Body)
+        return {"ETag": f"e{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        self.objects[Key] = b"".join(self.parts)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+
+
+def _s3_storage(monkeypatch) -> Storage:
+    monkeypatch.setattr(settings, "upload_chunk_size", 1024 * 1024)
+    monkeypatch.setattr(settings, "s3_multipart_threshold", 6 * 1024 * 1024)
+    monkeypatch.setattr(settings, "s3_multipart_part_size", 5 * 1024 * 1024)
+    storage = Storage.__new__(Storage)
+    storage.backend = "s3"
+    storage.bucket = "b"
+    storage._client = FakeS3()
+    return storage
+
+
+def test_s3_small_upload_is_single_put(monkeypatch):
+    storage = _s3_storage(monkeypatch)
+    stored = storage.save_stream("k", io.BytesIO(b"abc"))
+    assert storage._client.calls == ["put_object"]
+    assert stored.size == 3 and stored.checksum == hashlib.sha256(b"abc").hexdigest()
+
+
+def test_s3_large_upload_uses_multipart(monkeypatch):
+    storage = _s3_storage(monkeypatch)
+    data = bytes(range(256)) * (12 * 4096)  # 12 MiB
+    stored = storage.save_stream("k", io.BytesIO(data))
+    assert storage._client.calls.count("upload_part") == 3
+    assert storage._client.calls[-1] == "complete_multipart_upload"
+    assert storage._client.objects["k"] == data
+    assert stored.size == len(data) and stored.checksum == hashlib.sha256(data).hexdigest()
+
+
+def test_s3_oversize_aborts_multipart(monkeypatch):
+    storage = _s3_storage(monkeypatch)
+    with pytest.raises(UploadTooLarge):
+        storage.save_stream("k", io.BytesIO(b"x" * (12 * 1024 * 1024)), max_bytes=10 * 1024 * 1024)
+    assert storage._client.calls[-1] == "abort_multipart_upload"
+
+
+def test_upload_records_size_checksum_and_enforces_limit(client: TestClient, monkeypatch):
+    admin = _login(client, "admin@example.com", "admin123")
+    r = client.post("/reasons/", json={"type": "DEFAULT", "description": "StreamUp", "enabled": True, "sort_order": 70}, headers=_auth(admin))
+    reason_id = r.json()["id"]
+    r = client.post("/customers/", json={"name": "StreamCo", "industry": "S", "region": "S"}, headers=_auth(admin))
+    r = client.post("/applications/", json={"type": "DEFAULT", "customer_id": r.json()["id"], "reason_id": reason_id}, headers=_auth(admin))
+    app_id = r.json()["id"]
+
+    data = b"evidence" * 1000
+    r = client.post(f"/applications/{app_id}/attachments", files={"file": ("ev.pdf", data, "application/pdf")}, headers=_auth(admin))
+    assert r.status_code == 200, r.text
+    atts = client.get(f"/applications/{app_id}/attachments", headers=_auth(admin)).json()
+    assert atts[0]["size"] == len(data)
+    assert atts[0]["checksum"] == hashlib.sha256(data).hexdigest()
+
+    monkeypatch.setattr(settings, "max_upload_bytes", 1024)
+    monkeypatch.setattr(settings, "upload_chunk_size", 256)
+    r = client.post(f"/applications/{app_id}/attachments", files={"file": ("big.pdf", data, "application/pdf")}, headers=_auth(admin))
+    assert r.status_code == 413
+    names = [a["filename"] for a in client.get(f"/applications/{app_id}/attachments", headers=_auth(admin)).json()]
+    assert "big.pdf" not in names
+
+
+def test_upload_body_is_cut_off_while_received(client: TestClient, monkeypatch):
+    from app.upload_limit import MULTIPART_OVERHEAD_BYTES, UploadSizeLimitMiddleware
+    monkeypatch.setattr(settings, "max_upload_bytes", 1024)
+    admin = _login(client, "admin@example.com", "admin123")
+    # a declared oversized body is refused before the endpoint runs
+    r = client.post("/applications/1/attachments", files={"file": ("huge.pdf", b"x" * (2 * MULTIPART_OVERHEAD_BYTES), "application/pdf")}, headers=_auth(admin))
+    assert r.status_code == 413
+
+    # an undeclared body stops being read once it passes the cap
+    reads, sent = [], []
+
+    async def endless_receive():
+        reads.append(1)
+        return {"type": "http.request", "body": b"x" * 4096, "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        while (await receive())["type"] == "http.request":
+            pass
+        await send({"type": "http.response.start", "status": 400, "headers": []})
+
+    scope = {"type": "http", "method": "POST", "path": "/applications/7/attachments", "headers": []}
+    anyio.run(UploadSizeLimitMiddleware(app), scope, endless_receive, send)
+    assert len(reads) * 4096 <= 1024 + MULTIPART_OVERHEAD_BYTES + 4096
+    statuses = [m["status"] for m in sent if m["type"] == "http.response.start"]
+    assert statuses == [413]
+
+
+def test_storage_is_shared_and_boto3_is_lazy():
+    from app.storage import get_storage
+    assert get_storage() is get_storage()
+    # the local backend never imports boto3
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; from app.storage import get_storage; get_storage(); print('boto3' in sys.modules)"],
+        capture_output=True, text=True, env={**os.environ, "STORAGE_BACKEND": "local"},
+    )
+    assert out.stdout.strip() == "False", out.stderr
+
+
+def test_async_save_stream_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "local_storage_dir", str(tmp_path))
+    storage = Storage()
+
+    async def main():
+        return await storage.asave_stream("a/b.txt", io.BytesIO(b"hello"))
+
+    stored = anyio.run(main)
+    assert stored.size == 5
+    assert (tmp_path / "a" / "b.txt").read_bytes() == b"hello"